@@ -1,4 +1,6 @@
-from typing import Optional
+import os
+import tempfile
+from typing import Literal, Optional
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
@@ -19,12 +21,68 @@ class Settings(BaseSettings):
     aws_secret_access_key: Optional[str] = Field(default=None, env="AWS_SECRET_ACCESS_KEY")
     aws_region: Optional[str] = Field(default="us-east-1", env="AWS_REGION")
     aws_s3_bucket: Optional[str] = Field(default=None, env="AWS_S3_BUCKET")
+    s3_max_pool_connections: int = Field(default=50, env="S3_MAX_POOL_CONNECTIONS")
+    s3_connect_timeout: float = Field(default=5.0, env="S3_CONNECT_TIMEOUT")
+    s3_read_timeout: float = Field(default=60.0, env="S3_READ_TIMEOUT")
+    s3_multipart_threshold_bytes: int = Field(default=16 * 1024 * 1024, env="S3_MULTIPART_THRESHOLD_BYTES")
+    s3_multipart_part_size_bytes: int = Field(default=8 * 1024 * 1024, env="S3_MULTIPART_PART_SIZE_BYTES")
+    s3_multipart_concurrency: int = Field(default=4, env="S3_MULTIPART_CONCURRENCY")
+    upload_max_bytes: int = Field(default=20 * 1024 * 1024, env="UPLOAD_MAX_BYTES")
+    upload_presign_expires_seconds: int = Field(default=900, env="UPLOAD_PRESIGN_EXPIRES_SECONDS")
+    upload_spool_threshold_bytes: int = Field(default=16 * 1024 * 1024, env="UPLOAD_SPOOL_THRESHOLD_BYTES")
     database_url: Optional[str] = Field(default=None, env="DATABASE_URL")
     jwt_secret: Optional[str] = Field(default=None, env="JWT_SECRET")
     postmark_server_token: Optional[str] = Field(default=None, env="POSTMARK_SERVER_TOKEN")
     stripe_secret_key: Optional[str] = Field(default=None, env="STRIPE_SECRET_KEY")
     stripe_webhook_secret: Optional[str] = Field(default=None, env="STRIPE_WEBHOOK_SECRET")
     docling_url: Optional[str] = Field(default=None, env="DOCLING_URL")
+    docling_max_connections: int = Field(default=20, env="DOCLING_MAX_CONNECTIONS")
+    docling_max_keepalive_connections: int = Field(default=10, env="DOCLING_MAX_KEEPALIVE_CONNECTIONS")
+    docling_keepalive_expiry: float = Field(default=60.0, env="DOCLING_KEEPALIVE_EXPIRY")
+    docling_http2: bool = Field(default=False, env="DOCLING_HTTP2")
+    parse_local_enabled: bool = Field(default=True, env="PARSE_LOCAL_ENABLED")
+    parse_local_workers: int = Field(default=2, env="PARSE_LOCAL_WORKERS")
+    parse_min_chars_per_page: int = Field(default=200, env="PARSE_MIN_CHARS_PER_PAGE")
+    parse_docx_max_xml_bytes: int = Field(default=16 * 1024 * 1024, env="PARSE_DOCX_MAX_XML_BYTES")
+    docling_retry_attempts: int = Field(default=3, env="DOCLING_RETRY_ATTEMPTS")
+    docling_hedge_percentile: Optional[float] = Field(default=95.0, env="DOCLING_HEDGE_PERCENTILE")
+    docling_breaker_failure_threshold: int = Field(default=5, env="DOCLING_BREAKER_FAILURE_THRESHOLD")
+    docling_breaker_recovery_timeout: float = Field(default=30.0, env="DOCLING_BREAKER_RECOVERY_TIMEOUT")
+    docling_async_mode: bool = Field(default=True, env="DOCLING_ASYNC_MODE")
+    docling_poll_wait: float = Field(default=5.0, env="DOCLING_POLL_WAIT")
+    docling_task_timeout: float = Field(default=600.0, env="DOCLING_TASK_TIMEOUT")
+    docling_cancel_path: Optional[str] = Field(default=None, env="DOCLING_CANCEL_PATH")
+    docling_max_in_flight: int = Field(default=4, env="DOCLING_MAX_IN_FLIGHT")
+    docling_max_in_flight_per_user: int = Field(default=1, env="DOCLING_MAX_IN_FLIGHT_PER_USER")
+    docling_queue_size: int = Field(default=64, env="DOCLING_QUEUE_SIZE")
+    extract_max_in_flight: int = Field(default=8, env="EXTRACT_MAX_IN_FLIGHT")
+    extract_max_in_flight_per_user: int = Field(default=2, env="EXTRACT_MAX_IN_FLIGHT_PER_USER")
+    extract_queue_size: int = Field(default=256, env="EXTRACT_QUEUE_SIZE")
+    pdf_render_workers: int = Field(default=2, env="PDF_RENDER_WORKERS")
+    pdf_render_queue_size: int = Field(default=32, env="PDF_RENDER_QUEUE_SIZE")
+    pdf_spool_threshold_bytes: int = Field(default=8 * 1024 * 1024, env="PDF_SPOOL_THRESHOLD_BYTES")
+    template_hot_reload: bool = Field(default=False, env="TEMPLATE_HOT_RELOAD")
+    thumbnail_cache_max_bytes: int = Field(default=32 * 1024 * 1024, env="THUMBNAIL_CACHE_MAX_BYTES")
+    thumbnail_cache_backend: Optional[Literal["disk", "s3"]] = Field(default=None, env="THUMBNAIL_CACHE_BACKEND")
+    download_handle_ttl_seconds: int = Field(default=300, env="DOWNLOAD_HANDLE_TTL_SECONDS")
+    download_handle_purge_interval_seconds: float = Field(default=60.0, env="DOWNLOAD_HANDLE_PURGE_INTERVAL_SECONDS")
+    preview_fragment_cache_max_bytes: int = Field(default=16 * 1024 * 1024, env="PREVIEW_FRAGMENT_CACHE_MAX_BYTES")
+    cache_dir: str = Field(default=os.path.join(tempfile.gettempdir(), "frezume-cache"), env="CACHE_DIR")
+    document_cache_max_bytes: int = Field(default=512 * 1024 * 1024, env="DOCUMENT_CACHE_MAX_BYTES")
+    render_cache_max_bytes: int = Field(default=64 * 1024 * 1024, env="RENDER_CACHE_MAX_BYTES")
+    render_cache_backend: Optional[Literal["disk", "s3"]] = Field(default=None, env="RENDER_CACHE_BACKEND")
+    render_cache_tier_max_bytes: int = Field(default=1024 * 1024 * 1024, env="RENDER_CACHE_TIER_MAX_BYTES")
+    gateway_worker_concurrency: int = Field(default=4, env="GATEWAY_WORKER_CONCURRENCY")
+    gateway_embedded_workers: int = Field(default=4, env="GATEWAY_EMBEDDED_WORKERS")
+    gateway_job_lease_seconds: int = Field(default=60, env="GATEWAY_JOB_LEASE_SECONDS")
+    gateway_job_max_attempts: int = Field(default=3, env="GATEWAY_JOB_MAX_ATTEMPTS")
+    gateway_job_poll_interval: float = Field(default=5.0, env="GATEWAY_JOB_POLL_INTERVAL")
+    gateway_batch_max_files: int = Field(default=50, env="GATEWAY_BATCH_MAX_FILES")
+    gateway_batch_concurrency: int = Field(default=4, env="GATEWAY_BATCH_CONCURRENCY")
+    gateway_heartbeat_interval: float = Field(default=15.0, env="GATEWAY_HEARTBEAT_INTERVAL")
+    gateway_stream_idle_timeout: float = Field(default=900.0, env="GATEWAY_STREAM_IDLE_TIMEOUT")
+    gateway_upload_handoff_seconds: int = Field(default=300, env="GATEWAY_UPLOAD_HANDOFF_SECONDS")
+    gateway_disconnect_grace_seconds: Optional[float] = Field(default=45.0, env="GATEWAY_DISCONNECT_GRACE_SECONDS")
 
     class Config:
         env_file = ".env"
@@ -2,7 +2,7 @@ from enum import Enum
 from typing import Optional, List, Dict, Any
 from uuid import uuid4, UUID
 from sqlalchemy.dialects.postgresql import JSONB
-from sqlmodel import DateTime, Field, Relationship, func
+from sqlmodel import DateTime, Field, Relationship, UniqueConstraint, func
 from datetime import datetime, timezone, timedelta
 from app.document.dto import DocumentData
 from app.lib.model import BaseModel
@@ -22,6 +22,13 @@ class VerificationType(str, Enum):
     LINK = "link"
 
 
+class GatewayJobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCESS = "success"
+    FAILED = "failed"
+
+
 class Plan(str, Enum):
     FREE = "free"
     BASIC = "basic"
@@ -110,6 +117,53 @@ class Usage(BaseSQLModel, table=True):
     user: "User" = Relationship(back_populates="usage")
 
 
+class ParseCache(BaseSQLModel, table=True):
+    __tablename__ = "parse_cache"
+    __table_args__ = (UniqueConstraint("content_hash", "options_hash", name="uq_parse_cache_content_options"),)
+    content_hash: str = Field(index=True, description="sha256 of the uploaded document bytes")
+    options_hash: str = Field(description="Hash of the docling conversion options")
+    content_type: Optional[str] = Field(default=None, nullable=True)
+    file_size: int = Field(default=0)
+    text: str = Field(description="Text returned by docling for the document")
+    hits: int = Field(default=0)
+
+
+class GatewayJob(BaseSQLModel, table=True):
+    __tablename__ = "gateway_job"
+    user_id: UUID = Field(foreign_key="user.id", ondelete="CASCADE", index=True)
+    session_id: UUID = Field(foreign_key="session.id", ondelete="CASCADE")
+    submission_key: str = Field(unique=True, index=True, description="Idempotency key of the submission that created the job")
+    batch_id: Optional[UUID] = Field(default=None, nullable=True, index=True, description="Bulk import the job belongs to")
+    status: GatewayJobStatus = Field(default=GatewayJobStatus.PENDING, index=True)
+    template_name: str = Field()
+    job_description: str = Field()
+    filename: Optional[str] = Field(default=None, nullable=True)
+    content_type: Optional[str] = Field(default=None, nullable=True)
+    file_key: Optional[str] = Field(default=None, nullable=True, description="Storage key of the source document once stored, or reserved for it while its upload is handed off")
+    upload_host: Optional[str] = Field(default=None, nullable=True, description="Host whose document cache holds a direct upload until it is stored")
+    upload_result: Optional[Dict[str, Any]] = Field(sa_type=JSONB, default=None, nullable=True, description="Checkpoint of the upload stage")
+    parsed_content: Optional[str] = Field(default=None, nullable=True, description="Checkpoint of the parse stage")
+    extracted_data: Optional[Dict[str, Any]] = Field(sa_type=JSONB, default=None, nullable=True, description="Checkpoint of the extract stage")
+    error: Optional[str] = Field(default=None, nullable=True)
+    last_sequence: int = Field(default=0, description="Sequence number of the latest event")
+    attempt_sequence: int = Field(default=0, description="Sequence number the current attempt's events follow; earlier events belong to previous attempts")
+    worker_id: Optional[str] = Field(default=None, nullable=True, description="Worker holding the lease on a running job")
+    lease_expires_at: Optional[datetime] = Field(default=None, nullable=True, sa_type=DateTime(timezone=True), description="When a running job's lease lapses and it may be reclaimed")
+    attempts: int = Field(default=0, description="Number of times a worker has claimed the job")
+    watched_at: datetime = Field(default_factory=default_time, nullable=False, sa_type=DateTime(timezone=True), description="Last time a client streamed or polled the job")
+    watchers: int = Field(default=0, description="Number of open event streams following the job")
+
+
+class GatewayJobEvent(BaseSQLModel, table=True):
+    __tablename__ = "gateway_job_event"
+    __table_args__ = (UniqueConstraint("job_id", "sequence", name="uq_gateway_job_event_sequence"),)
+    job_id: UUID = Field(foreign_key="gateway_job.id", ondelete="CASCADE", index=True)
+    sequence: int = Field()
+    status: str = Field()
+    data: Optional[Dict[str, Any]] = Field(sa_type=JSONB, default=None, nullable=True)
+    timing: Optional[Dict[str, Any]] = Field(sa_type=JSONB, default=None, nullable=True, description="Stage timing carried by the event")
+
+
 class SessionState(BaseSQLModel, table=True):
     __tablename__ = "session_state"
     session_id: UUID = Field(foreign_key="session.id", ondelete="CASCADE")
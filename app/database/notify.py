@@ -0,0 +1,67 @@
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional
+import asyncpg
+from app.config import settings
+
+NotificationCallback = Callable[[str], None]
+
+
+class NotificationListener:
+    # One dedicated connection per process LISTENs on every channel in use and fans payloads out
+    # to in-process callbacks. Notifications sent while the connection is down are lost, so
+    # consumers keep a slow poll as a safety net.
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, dsn: str, reconnect_delay: float = 2.0):
+        self.dsn = dsn
+        self.reconnect_delay = reconnect_delay
+        self._callbacks: Dict[str, List[NotificationCallback]] = {}
+        self._connection: Optional[asyncpg.Connection] = None
+        self._lock = asyncio.Lock()
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def _dispatch(self, connection: asyncpg.Connection, pid: int, channel: str, payload: str) -> None:
+        for callback in list(self._callbacks.get(channel, [])): callback(payload)
+
+    def _on_terminate(self, connection: asyncpg.Connection) -> None:
+        if self._closed or connection is not self._connection: return
+        self.logger.warning("Notification connection lost, reconnecting")
+        self._connection = None
+        self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        while not self._closed and self._connection is None:
+            try: await self.start()
+            except Exception as e:
+                self.logger.warning(f"Notification reconnect failed: {str(e)}")
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def start(self) -> None:
+        async with self._lock:
+            if self._connection is not None: return
+            self._closed = False
+            connection = await asyncpg.connect(self.dsn)
+            connection.add_termination_listener(self._on_terminate)
+            for channel in self._callbacks: await connection.add_listener(channel, self._dispatch)
+            self._connection = connection
+
+    async def listen(self, channel: str, callback: NotificationCallback) -> None:
+        new_channel = channel not in self._callbacks
+        self._callbacks.setdefault(channel, []).append(callback)
+        if self._connection is None: await self.start()
+        elif new_channel: await self._connection.add_listener(channel, self._dispatch)
+
+    def unlisten(self, channel: str, callback: NotificationCallback) -> None:
+        callbacks = self._callbacks.get(channel, [])
+        if callback in callbacks: callbacks.remove(callback)
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._reconnect_task: self._reconnect_task.cancel()
+        if self._connection is not None: await self._connection.close()
+        self._connection = None
+
+
+notification_listener = NotificationListener(settings.database_url)
@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import secrets
+from pathlib import Path
+from urllib.parse import quote, unquote
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional, Union
+from app.config import settings
+from app.lib.cache import CacheTier, DiskCache, LRUByteCache, create_cache_tier
+from app.lib.metrics import metrics
+from app.lib.s3 import s3_pool
+from app.document.dto import DocumentData, RenderCacheStats, RenderedDocument
+
+
+class RenderCache:
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, max_bytes: int, tier: Optional[CacheTier] = None, name: str = "render", backend: Optional[str] = None):
+        self.name = name
+        self.backend = backend
+        self.memory = LRUByteCache(max_bytes)
+        self.tier = tier
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._hits = metrics.counter(f"{name}_cache_hits")
+        self._misses = metrics.counter(f"{name}_cache_misses")
+
+    @staticmethod
+    def key(template_name: str, template_version: str, data: DocumentData) -> str:
+        payload = {"template": template_name, "version": template_version, "data": data.model_dump(mode="json")}
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if (value := self.memory.get(key)) is not None: return value
+        if self.tier is None: return None
+        try: value = await self.tier.get(key)
+        except Exception as e:
+            self.logger.warning(f"{self.name} cache tier read failed for {key}: {str(e)}")
+            return None
+        if value is not None: self.memory.put(key, value)
+        return value
+
+    async def put(self, key: str, value: bytes) -> None:
+        self.memory.put(key, value)
+        if self.tier is None: return
+        try: await self.tier.put(key, value)
+        except Exception as e: self.logger.warning(f"{self.name} cache tier write failed for {key}: {str(e)}")
+
+    async def get_or_create(self, key: str, factory: Callable[[], Awaitable[Union[bytes, str]]]) -> tuple[Union[bytes, str], bool]:
+        # The factory may return a spooled file path instead of bytes; those are owned by the
+        # caller that rendered them, so they are neither cached nor shared with waiters.
+        if (value := await self.get(key)) is not None:
+            self._hits.inc()
+            return value, True
+        if key in self._inflight and (value := await asyncio.shield(self._inflight[key])) is not None: return value, True
+        self._misses.inc()
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await factory()
+            if isinstance(value, bytes): await self.put(key, value)
+            future.set_result(value if isinstance(value, bytes) else None)
+            return value, False
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> RenderCacheStats:
+        return RenderCacheStats(
+            entries=len(self.memory),
+            size_bytes=self.memory.size,
+            max_bytes=self.memory.max_bytes,
+            hits=self._hits.value,
+            misses=self._misses.value,
+            tier=self.backend,
+            name=self.name,
+        )
+
+
+class DownloadHandles:
+    # Issued PDFs are stored in S3 under their handle, so a link issued by one API process
+    # resolves on any other. Expiry is checked on every resolve, and a timer deletes expired
+    # objects even when no requests come in.
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, bucket_name: Optional[str], ttl_seconds: int, purge_interval: float, prefix: str = "downloads"):
+        self.bucket_name = bucket_name
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval = purge_interval
+        self.prefix = prefix
+        self._purger: Optional[asyncio.Task] = None
+
+    def _key(self, handle: str) -> str:
+        return f"{self.prefix}/{handle}"
+
+    async def issue(self, document: RenderedDocument) -> str:
+        # A spooled render is copied to S3 and its temp file removed; the handle owns the copy.
+        handle = secrets.token_urlsafe(24)
+        content = document.content if document.content is not None else await asyncio.to_thread(Path(document.path).read_bytes)
+        metadata = {"file-name": quote(document.file_name), "etag": document.etag, "expires-at": str(int(time.time()) + self.ttl_seconds)}
+        s3_client = await s3_pool.client()
+        await s3_client.put_object(Bucket=self.bucket_name, Key=self._key(handle), Body=content, ContentType="application/pdf", Metadata=metadata)
+        if document.path:
+            try: os.remove(document.path)
+            except OSError as e: self.logger.warning(f"Failed to remove spooled render {document.path}: {str(e)}")
+        return handle
+
+    async def resolve(self, handle: str) -> Optional[RenderedDocument]:
+        s3_client = await s3_pool.client()
+        try: response = await s3_client.get_object(Bucket=self.bucket_name, Key=self._key(handle))
+        except s3_client.exceptions.NoSuchKey: return None
+        metadata = response["Metadata"]
+        async with response["Body"] as body:
+            if int(metadata.get("expires-at", 0)) <= time.time(): return None
+            content = await body.read()
+        return RenderedDocument(file_name=unquote(metadata["file-name"]), etag=metadata["etag"], content=content)
+
+    async def purge(self) -> None:
+        s3_client = await s3_pool.client()
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)
+        paginator = s3_client.get_paginator("list_objects_v2")
+        async for page in paginator.paginate(Bucket=self.bucket_name, Prefix=f"{self.prefix}/"):
+            expired = [{"Key": item["Key"]} for item in page.get("Contents", []) if item["LastModified"] <= cutoff]
+            if expired: await s3_client.delete_objects(Bucket=self.bucket_name, Delete={"Objects": expired, "Quiet": True})
+
+    async def _purge_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.purge_interval)
+            try: await self.purge()
+            except Exception as e: self.logger.warning(f"Failed to purge expired download handles: {str(e)}")
+
+    def start(self) -> None:
+        if self._purger is None: self._purger = asyncio.create_task(self._purge_loop())
+
+    async def stop(self) -> None:
+        if self._purger is None: return
+        self._purger.cancel()
+        await asyncio.gather(self._purger, return_exceptions=True)
+        self._purger = None
+
+
+render_cache = RenderCache(
+    max_bytes=settings.render_cache_max_bytes,
+    tier=create_cache_tier(settings.render_cache_backend, "renders", settings.render_cache_tier_max_bytes, suffix=".pdf", content_type="application/pdf"),
+    backend=settings.render_cache_backend,
+)
+thumbnail_cache = RenderCache(
+    max_bytes=settings.thumbnail_cache_max_bytes,
+    tier=create_cache_tier(settings.thumbnail_cache_backend, "thumbnails", settings.render_cache_tier_max_bytes),
+    name="thumbnail",
+    backend=settings.thumbnail_cache_backend,
+)
+
+document_cache = DiskCache(os.path.join(settings.cache_dir, "documents"), settings.document_cache_max_bytes)
+
+download_handles = DownloadHandles(settings.aws_s3_bucket, ttl_seconds=settings.download_handle_ttl_seconds, purge_interval=settings.download_handle_purge_interval_seconds)
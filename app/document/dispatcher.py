@@ -0,0 +1,163 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+from fastapi import HTTPException
+from app.config import settings
+from app.lib.constants import ERROR_DOCLING_QUEUE_FULL, ERROR_EXTRACT_QUEUE_FULL
+from app.lib.metrics import metrics
+from app.document.dto import DispatcherStats
+
+PositionCallback = Callable[[int], Awaitable[None]]
+
+
+class _Waiter:
+    def __init__(self, user_key: str):
+        self.user_key = user_key
+        self.position = 0
+        self.admitted = asyncio.get_running_loop().create_future()
+        self.changed = asyncio.Event()
+
+
+class AdmissionDispatcher:
+    # Admission control in front of an expensive upstream (docling, the extraction LLM): at most
+    # max_in_flight calls overall and max_in_flight_per_user per user. The excess waits in
+    # per-user FIFO queues that are served round-robin, so one user's burst, such as a bulk
+    # import, cannot starve everybody else. Limits are per process: every API and gateway worker
+    # process has its own dispatchers, so the upstream sees up to max_in_flight times the number
+    # of processes; size DOCLING_MAX_IN_FLIGHT and EXTRACT_MAX_IN_FLIGHT accordingly.
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, name: str, max_in_flight: int, max_in_flight_per_user: int, max_queue_size: int, busy_detail: str):
+        self.name = name
+        self.busy_detail = busy_detail
+        self.max_in_flight = max_in_flight
+        self.max_in_flight_per_user = max_in_flight_per_user
+        self.max_queue_size = max_queue_size
+        self._in_flight = 0
+        self._user_in_flight: Dict[str, int] = {}
+        self._queues: OrderedDict[str, deque[_Waiter]] = OrderedDict()
+        self._queued = 0
+        self._queue_depth = metrics.gauge(f"{name}_queue_depth")
+        self._queue_wait_ms = metrics.histogram(f"{name}_queue_wait_ms")
+        self._rejected = metrics.counter(f"{name}_rejected")
+
+    def _can_admit(self, user_key: str) -> bool:
+        return self._in_flight < self.max_in_flight and self._user_in_flight.get(user_key, 0) < self.max_in_flight_per_user
+
+    def _admit(self, user_key: str) -> None:
+        self._in_flight += 1
+        self._user_in_flight[user_key] = self._user_in_flight.get(user_key, 0) + 1
+
+    def _release(self, user_key: str) -> None:
+        self._in_flight -= 1
+        self._user_in_flight[user_key] -= 1
+        if not self._user_in_flight[user_key]: del self._user_in_flight[user_key]
+        self._dispatch()
+
+    def _set_queued(self, delta: int) -> None:
+        self._queued += delta
+        self._queue_depth.set(self._queued)
+
+    def _dispatch(self) -> None:
+        # Walk the users in rotation order; a served user moves to the back of the rotation.
+        admitted = True
+        while admitted and self._in_flight < self.max_in_flight:
+            admitted = False
+            for user_key in list(self._queues):
+                if self._in_flight >= self.max_in_flight: break
+                if not self._can_admit(user_key): continue
+                queue = self._queues.pop(user_key)
+                waiter = queue.popleft()
+                self._set_queued(-1)
+                self._admit(user_key)
+                waiter.admitted.set_result(None)
+                admitted = True
+                if queue: self._queues[user_key] = queue
+        self._update_positions()
+
+    def _update_positions(self) -> None:
+        # Positions follow the round-robin order the queues will actually be served in.
+        queues, position, depth = list(self._queues.values()), 0, 0
+        while any(depth < len(queue) for queue in queues):
+            for queue in queues:
+                if depth >= len(queue): continue
+                position += 1
+                if queue[depth].position != position:
+                    queue[depth].position = position
+                    queue[depth].changed.set()
+            depth += 1
+
+    def _remove(self, waiter: _Waiter) -> None:
+        queue = self._queues.get(waiter.user_key)
+        if queue is None or waiter not in queue: return
+        queue.remove(waiter)
+        self._set_queued(-1)
+        if not queue: del self._queues[waiter.user_key]
+        self._update_positions()
+
+    async def _wait(self, waiter: _Waiter, on_position: Optional[PositionCallback]) -> None:
+        reported = None
+        while not waiter.admitted.done():
+            if on_position and waiter.position != reported:
+                reported = waiter.position
+                await on_position(reported)
+            waiter.changed.clear()
+            changed = asyncio.ensure_future(waiter.changed.wait())
+            try: await asyncio.wait({waiter.admitted, changed}, return_when=asyncio.FIRST_COMPLETED)
+            finally: changed.cancel()
+        if on_position and reported is not None: await on_position(0)
+
+    async def acquire(self, user_key: str, on_position: Optional[PositionCallback] = None) -> None:
+        if not self._queued and self._can_admit(user_key):
+            self._admit(user_key)
+            return
+        if self._queued >= self.max_queue_size:
+            self._rejected.inc()
+            raise HTTPException(status_code=503, detail=self.busy_detail, headers={"Retry-After": "10"})
+        queued_at = time.perf_counter()
+        waiter = _Waiter(user_key)
+        self._queues.setdefault(user_key, deque()).append(waiter)
+        self._set_queued(1)
+        self._dispatch()
+        try: await self._wait(waiter, on_position)
+        except BaseException:
+            if waiter.admitted.done(): self._release(user_key)
+            else: self._remove(waiter)
+            raise
+        self._queue_wait_ms.observe((time.perf_counter() - queued_at) * 1000)
+
+    async def run(self, user_key: str, factory: Callable[[], Awaitable[Any]], on_position: Optional[PositionCallback] = None) -> Any:
+        await self.acquire(user_key, on_position)
+        try: return await factory()
+        finally: self._release(user_key)
+
+    def stats(self) -> DispatcherStats:
+        return DispatcherStats(
+            max_in_flight=self.max_in_flight,
+            max_in_flight_per_user=self.max_in_flight_per_user,
+            max_queue_size=self.max_queue_size,
+            in_flight=self._in_flight,
+            queued=self._queued,
+            users_waiting=len(self._queues),
+            rejected=self._rejected.value,
+            queue_wait_ms=self._queue_wait_ms.snapshot(),
+        )
+
+
+docling_dispatcher = AdmissionDispatcher(
+    name="docling",
+    max_in_flight=settings.docling_max_in_flight,
+    max_in_flight_per_user=settings.docling_max_in_flight_per_user,
+    max_queue_size=settings.docling_queue_size,
+    busy_detail=ERROR_DOCLING_QUEUE_FULL,
+)
+
+extract_dispatcher = AdmissionDispatcher(
+    name="extract",
+    max_in_flight=settings.extract_max_in_flight,
+    max_in_flight_per_user=settings.extract_max_in_flight_per_user,
+    max_queue_size=settings.extract_queue_size,
+    busy_detail=ERROR_EXTRACT_QUEUE_FULL,
+)
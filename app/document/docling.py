@@ -0,0 +1,108 @@
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+from fastapi import HTTPException
+from app.config import settings
+from app.lib.http_client import HttpClient
+from app.lib.resilience import CircuitBreaker, HedgePolicy, RetryPolicy
+from app.lib.metrics import metrics
+
+CONVERT_OPTIONS = {"to_formats": ["text"]}
+CONVERT_OPTIONS_HASH = hashlib.sha256(json.dumps(CONVERT_OPTIONS, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+TASK_DONE_STATUSES = ("success", "failure")
+
+ProgressCallback = Callable[[str, Optional[int]], Awaitable[None]]
+
+docling_client = HttpClient(
+    base_url=settings.docling_url,
+    timeout=300.0,
+    max_connections=settings.docling_max_connections,
+    max_keepalive_connections=settings.docling_max_keepalive_connections,
+    keepalive_expiry=settings.docling_keepalive_expiry,
+    http2=settings.docling_http2,
+    name="docling",
+    retry=RetryPolicy(max_attempts=settings.docling_retry_attempts),
+    hedge=HedgePolicy(percentile=settings.docling_hedge_percentile) if settings.docling_hedge_percentile else None,
+    breaker=CircuitBreaker("docling", failure_threshold=settings.docling_breaker_failure_threshold, recovery_timeout=settings.docling_breaker_recovery_timeout),
+)
+
+
+class DoclingConverter:
+    # In async mode a conversion is submitted as a docling task and long-polled, so no single
+    # HTTP request is held open for the whole conversion and the caller sees the task move
+    # through pending/started. A task abandoned by timeout or cancellation is cancelled upstream
+    # only when DOCLING_CANCEL_PATH names a cancel endpoint; without one (the default) polling
+    # stops, but the task runs to completion in docling and its result is discarded.
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, client: HttpClient, async_mode: bool, poll_wait: float, task_timeout: float, cancel_path: Optional[str] = None):
+        self.client = client
+        self.async_mode = async_mode
+        self.poll_wait = poll_wait
+        self.task_timeout = task_timeout
+        self.cancel_path = cancel_path
+        self._task_ms = metrics.histogram("docling_task_ms")
+        self._abandoned = metrics.counter("docling_tasks_abandoned")
+        self._cancelled = metrics.counter("docling_tasks_cancelled")
+
+    async def _convert_sync(self, files: Dict[str, Any]) -> Dict[str, Any]:
+        response = await self.client.post("/v1/convert/file", files=files, data=CONVERT_OPTIONS)
+        response.raise_for_status()
+        return response.json()
+
+    async def _cancel(self, task_id: str) -> None:
+        # Every abandoned task is counted; docling_tasks_cancelled only counts those docling
+        # confirmed cancelling.
+        self._abandoned.inc()
+        if not self.cancel_path:
+            self.logger.warning(f"Abandoning docling task {task_id}, no cancel endpoint configured")
+            return
+        try:
+            response = await self.client.delete(self.cancel_path.format(task_id=task_id), timeout=10.0)
+            response.raise_for_status()
+            self._cancelled.inc()
+        except Exception as e: self.logger.warning(f"Failed to cancel docling task {task_id}: {str(e)}")
+
+    async def _poll(self, task: Dict[str, Any], on_progress: Optional[ProgressCallback]) -> Dict[str, Any]:
+        deadline = time.monotonic() + self.task_timeout
+        reported = None
+        while task["task_status"] not in TASK_DONE_STATUSES:
+            if on_progress and (task["task_status"], task.get("task_position")) != reported:
+                reported = (task["task_status"], task.get("task_position"))
+                await on_progress(*reported)
+            if time.monotonic() >= deadline: raise HTTPException(status_code=504, detail=f"Docling task {task['task_id']} did not finish within {self.task_timeout}s")
+            response = await self.client.get(f"/v1/status/poll/{task['task_id']}", params={"wait": self.poll_wait}, timeout=self.poll_wait + 30.0, hedge=False)
+            response.raise_for_status()
+            task = response.json()
+        return task
+
+    async def _convert_async(self, files: Dict[str, Any], on_progress: Optional[ProgressCallback]) -> Dict[str, Any]:
+        started_at = time.perf_counter()
+        response = await self.client.post("/v1/convert/file/async", files=files, data=CONVERT_OPTIONS)
+        response.raise_for_status()
+        task = response.json()
+        try: task = await self._poll(task, on_progress)
+        except BaseException:
+            await asyncio.shield(self._cancel(task["task_id"]))
+            raise
+        if task["task_status"] == "failure": raise HTTPException(status_code=502, detail=f"Docling task {task['task_id']} failed: {task.get('task_meta')}")
+        response = await self.client.get(f"/v1/result/{task['task_id']}")
+        response.raise_for_status()
+        self._task_ms.observe((time.perf_counter() - started_at) * 1000)
+        return response.json()
+
+    async def convert(self, files: Dict[str, Any], on_progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        if self.async_mode: return await self._convert_async(files, on_progress)
+        return await self._convert_sync(files)
+
+
+docling_converter = DoclingConverter(
+    docling_client,
+    async_mode=settings.docling_async_mode,
+    poll_wait=settings.docling_poll_wait,
+    task_timeout=settings.docling_task_timeout,
+    cancel_path=settings.docling_cancel_path,
+)
@@ -1,6 +1,9 @@
+from datetime import datetime
+from io import BufferedIOBase
 from typing import List, Optional, Literal, Dict
 from sqlmodel import Field
 from app.lib.model import BaseModel
+from app.lib.metrics import HistogramSnapshot
 
 
 class UploadDocumentResult(BaseModel):
@@ -12,6 +15,34 @@ class UploadDocumentResult(BaseModel):
     file_size: int = Field(description="File size")
 
 
+class PresignUploadRequest(BaseModel):
+    filename: str = Field(min_length=1, max_length=255, description="Original file name")
+    content_type: str = Field(description="Content type the file will be uploaded with")
+    file_size: int = Field(gt=0, description="Size of the file in bytes")
+
+
+class PresignedUpload(BaseModel):
+    url: str = Field(description="URL to POST the multipart form to")
+    fields: Dict[str, str] = Field(description="Form fields to send before the file field")
+    file_key: str = Field(description="Storage key the file will be stored under")
+    file_url: str = Field(description="File URL once the upload completes")
+    max_size: int = Field(description="Largest accepted file size in bytes")
+    expires_in: int = Field(description="Seconds until the upload URL expires")
+
+
+class StoredDocument(BaseModel):
+    file_key: str = Field(description="Storage key of the document")
+    filename: str = Field(description="File name to serve the document as")
+    content_type: str = Field(description="Content type of the document")
+    size: int = Field(description="Size of the document in bytes")
+    file: Optional[BufferedIOBase] = Field(default=None, exclude=True, description="Open handle on the local cached copy, unset when the document is streamed from storage")
+    cache_hit: bool = Field(default=False, description="Whether the document was served from the local cache")
+
+
+class CompleteUploadRequest(BaseModel):
+    file_key: str = Field(description="Storage key returned by the presign call")
+
+
 class Basics(BaseModel):
     name: str = Field(description="Full name of the person")
     email: str = Field(description="Email address")
@@ -91,3 +122,101 @@ class ExtractDocumentRequest(BaseModel):
 class GenerateDocumentRequest(BaseModel):
     template_name: Optional[Literal["default", "modern", "classic"]] = Field(default="default", description="Template name: 'default', 'modern', or 'classic'")
     document_data: DocumentData = Field(description="Document data")
+
+
+class BatchGenerateDocumentRequest(BaseModel):
+    template_names: List[Literal["default", "modern", "classic"]] = Field(min_length=1, description="Templates to render the document with")
+    document_data: DocumentData = Field(description="Document data")
+
+
+class ThumbnailRequest(BaseModel):
+    template_name: Literal["default", "modern", "classic"] = Field(default="default", description="Template name: 'default', 'modern', or 'classic'")
+    document_data: DocumentData = Field(description="Document data")
+    page: int = Field(default=1, ge=1, description="1-based page number to rasterize")
+    dpi: int = Field(default=72, ge=24, le=200, description="Output resolution in dots per inch")
+    image_format: Literal["png", "webp"] = Field(default="webp", description="Output image format")
+    all_pages: bool = Field(default=False, description="Rasterize and cache every page while producing the requested one")
+
+
+class Thumbnail(BaseModel):
+    content: bytes = Field(description="Encoded image bytes")
+    media_type: str = Field(description="Image media type")
+    etag: str = Field(description="Strong ETag derived from the rendered PDF and thumbnail options")
+    cache_hit: bool = Field(default=False, description="Whether the image was served from the thumbnail cache")
+
+
+class GeneratedDocumentHandle(BaseModel):
+    template_name: str = Field(description="Template name")
+    file_name: str = Field(description="Download file name")
+    download_url: str = Field(description="Short-lived URL to download the rendered PDF")
+    etag: str = Field(description="Strong ETag of the rendered PDF")
+    size_bytes: int = Field(description="Size of the rendered PDF in bytes")
+    render_ms: float = Field(description="Time taken to produce the PDF in milliseconds")
+    cache_hit: bool = Field(description="Whether the PDF was served from the render cache")
+
+
+class BatchGenerateDocumentResult(BaseModel):
+    documents: List[GeneratedDocumentHandle] = Field(description="Rendered documents in request order")
+    expires_in: int = Field(description="Seconds until the download URLs expire")
+    total_ms: float = Field(description="Wall-clock time for the whole batch in milliseconds")
+
+
+class RenderStats(BaseModel):
+    workers: int = Field(description="Number of PDF render worker processes")
+    max_queue_size: int = Field(description="Maximum number of renders allowed to wait for a worker")
+    queued: int = Field(description="Renders currently waiting for a worker")
+    in_flight: int = Field(description="Renders currently running in a worker")
+    rejected: int = Field(description="Renders rejected because the queue was full")
+    queue_wait_ms: HistogramSnapshot = Field(description="Time spent waiting for a worker in milliseconds")
+    render_ms: HistogramSnapshot = Field(description="Time spent rendering in a worker in milliseconds")
+    rasterize_ms: HistogramSnapshot = Field(description="Time spent rasterizing thumbnails in a worker in milliseconds")
+
+
+class RenderCacheStats(BaseModel):
+    entries: int = Field(description="Rendered documents held in memory")
+    size_bytes: int = Field(description="Bytes held by the in-memory tier")
+    max_bytes: int = Field(description="Byte budget of the in-memory tier")
+    hits: int = Field(description="Renders served from the cache")
+    misses: int = Field(description="Renders that had to be laid out")
+    tier: Optional[str] = Field(default=None, description="Secondary cache tier, if any")
+    name: str = Field(default="render", description="Cache name")
+
+
+class ParseResult(BaseModel):
+    text: Optional[str] = Field(default=None, description="Extracted document text")
+    engine: str = Field(description="Engine that produced the text: 'pdf', 'docx', 'txt', 'docling' or 'cache'")
+    parse_ms: float = Field(description="Wall time spent producing the text, in milliseconds")
+
+
+class DispatcherStats(BaseModel):
+    max_in_flight: int = Field(description="Maximum concurrent upstream calls from this process")
+    max_in_flight_per_user: int = Field(description="Maximum concurrent upstream calls per user from this process")
+    max_queue_size: int = Field(description="Maximum number of calls allowed to wait for a slot")
+    in_flight: int = Field(description="Calls from this process currently running upstream")
+    queued: int = Field(description="Calls currently waiting for a slot")
+    users_waiting: int = Field(description="Distinct users with calls waiting for a slot")
+    rejected: int = Field(description="Calls rejected because the queue was full")
+    queue_wait_ms: HistogramSnapshot = Field(description="Time spent waiting for a slot in milliseconds")
+
+
+class ParseCacheStats(BaseModel):
+    entries: int = Field(description="Parsed documents stored in the parse cache")
+    hits: int = Field(description="Parses served from the cache since startup")
+    misses: int = Field(description="Parses that had to go to docling since startup")
+    hit_ratio: float = Field(description="hits / (hits + misses) since startup")
+
+
+class RenderedDocument(BaseModel):
+    file_name: str = Field(description="Download file name")
+    content: Optional[bytes] = Field(default=None, description="Rendered PDF bytes when held in memory")
+    path: Optional[str] = Field(default=None, description="Spooled temp file holding the PDF when it exceeds the in-memory threshold")
+    etag: str = Field(description="Strong ETag derived from the template and document data")
+    cache_hit: bool = Field(default=False, description="Whether the PDF was served from the render cache")
+    render_ms: float = Field(default=0.0, description="Time taken to produce the PDF in milliseconds")
+
+
+class TemplateInfo(BaseModel):
+    name: str = Field(description="Template name")
+    version: str = Field(description="Hash of the template source")
+    compile_ms: float = Field(description="Time taken to compile the template in milliseconds")
+    loaded_at: datetime = Field(description="When the template was last compiled")
@@ -0,0 +1,64 @@
+import asyncio
+import hashlib
+from typing import AsyncIterator, Optional
+from fastapi import UploadFile
+from app.config import settings
+
+
+class UploadBuffer:
+    # An upload read at most once. Small files are read into one immutable bytes object that
+    # S3, docling and hashing all share. Files above the spool threshold stay in the request's
+    # spooled temp file and are streamed in chunks until a consumer needs the whole body; their
+    # hash is taken in one pass over the file when the buffer is created.
+    HASH_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, filename: str, content_type: str | None, content: Optional[bytes] = None, file: Optional[UploadFile] = None, size: Optional[int] = None):
+        self.filename = filename
+        self.content_type = content_type
+        self.content = content
+        self.file = file
+        self._size = size
+        self._sha256: Optional[str] = None
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    async def from_upload(cls, file: UploadFile, spool_threshold: int = settings.upload_spool_threshold_bytes) -> "UploadBuffer":
+        await file.seek(0)
+        if file.size is not None and file.size > spool_threshold:
+            upload = cls(file.filename, file.content_type, file=file, size=file.size)
+            digest = hashlib.sha256()
+            async for chunk in upload.chunks(cls.HASH_CHUNK_SIZE): digest.update(chunk)
+            upload._sha256 = digest.hexdigest()
+            return upload
+        return cls(file.filename, file.content_type, await file.read())
+
+    @property
+    def size(self) -> int:
+        return len(self.content) if self.content is not None else self._size
+
+    async def read(self) -> bytes:
+        async with self._lock:
+            if self.content is None:
+                await self.file.seek(0)
+                self.content = await self.file.read()
+        return self.content
+
+    async def chunks(self, chunk_size: int) -> AsyncIterator[memoryview | bytes]:
+        if self.content is not None:
+            view = memoryview(self.content)
+            for offset in range(0, len(self.content), chunk_size): yield view[offset:offset + chunk_size]
+            return
+        # Seek and read under the lock, so concurrent consumers never see each other's file position.
+        offset = 0
+        while True:
+            async with self._lock:
+                await self.file.seek(offset)
+                chunk = await self.file.read(chunk_size)
+            if not chunk: return
+            offset += len(chunk)
+            yield chunk
+
+    @property
+    def sha256(self) -> str:
+        if self._sha256 is None: self._sha256 = hashlib.sha256(self.content).hexdigest()
+        return self._sha256
@@ -0,0 +1,143 @@
+import json
+import time
+import hashlib
+import asyncio
+import logging
+import zipfile
+import threading
+import pypdfium2 as pdfium
+from io import BytesIO
+from xml.etree import ElementTree
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional
+from pypdfium2.version import PDFIUM_INFO, PYPDFIUM_INFO
+from app.config import settings
+from app.lib.metrics import metrics
+from app.document.dto import ParseResult
+from app.document.docling import CONVERT_OPTIONS_HASH
+
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+DOCX_COMPLEX_MARKERS = (b"w:txbxContent", b"mc:AlternateContent", b"w:framePr")
+TEXT_EXTENSIONS = ("txt", "md", "markdown", "text")
+
+# pdfium is not thread-safe, so PDF extraction is serialized; DOCX/TXT run in parallel.
+_pdfium_lock = threading.Lock()
+
+Extractor = Callable[[bytes], Optional[str]]
+
+
+def _is_garbled(text: str) -> bool:
+    # Text layers from broken font encodings come out as replacement or private-use characters.
+    unreadable = sum(1 for char in text if char == "\ufffd" or "\ue000" <= char <= "\uf8ff")
+    return unreadable > len(text) * 0.05
+
+
+def extract_pdf(content: bytes) -> Optional[str]:
+    with _pdfium_lock:
+        document = pdfium.PdfDocument(content)
+        try:
+            pages = []
+            for page in document:
+                textpage = page.get_textpage()
+                pages.append(textpage.get_text_bounded().strip())
+                textpage.close()
+                page.close()
+        finally:
+            document.close()
+    text = "\n\n".join(page for page in pages if page)
+    # Scanned pages have no text layer; any mostly image-only document goes to docling for OCR.
+    if not pages or len(text) < settings.parse_min_chars_per_page * len(pages): return None
+    if sum(1 for page in pages if page) < len(pages) * 0.8 or _is_garbled(text): return None
+    return text
+
+
+def extract_docx(content: bytes) -> Optional[str]:
+    # A small archive can inflate to gigabytes, so anything larger than the cap, by its declared
+    # size or by what actually comes out of the stream, is left to docling.
+    with zipfile.ZipFile(BytesIO(content)) as archive:
+        if archive.getinfo("word/document.xml").file_size > settings.parse_docx_max_xml_bytes: return None
+        with archive.open("word/document.xml") as member: document_xml = member.read(settings.parse_docx_max_xml_bytes + 1)
+    if len(document_xml) > settings.parse_docx_max_xml_bytes: return None
+    # Text boxes, frames and alternate content are layout-driven and duplicate text across
+    # fallbacks, so those documents are left to docling.
+    if any(marker in document_xml for marker in DOCX_COMPLEX_MARKERS): return None
+    paragraphs = []
+    for paragraph in ElementTree.fromstring(document_xml).iter(f"{WORD_NAMESPACE}p"):
+        parts = []
+        for node in paragraph.iter():
+            if node.tag == f"{WORD_NAMESPACE}t" and node.text: parts.append(node.text)
+            elif node.tag == f"{WORD_NAMESPACE}tab": parts.append("\t")
+            elif node.tag in (f"{WORD_NAMESPACE}br", f"{WORD_NAMESPACE}cr"): parts.append("\n")
+        paragraphs.append("".join(parts))
+    text = "\n".join(paragraphs).strip()
+    return text or None
+
+
+def extract_text(content: bytes) -> Optional[str]:
+    try: text = content.decode("utf-8-sig").strip()
+    except UnicodeDecodeError: return None
+    return text or None
+
+
+class ParserEngine:
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, max_workers: int, enabled: bool = True):
+        self.enabled = enabled
+        self.extractors: Dict[str, Extractor] = {}
+        # docling's server version is not known here; its conversion options stand in for it.
+        self.versions: Dict[str, str] = {"docling": CONVERT_OPTIONS_HASH}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="parser")
+
+    def register(self, kind: str, extractor: Extractor, version: str) -> None:
+        self.extractors[kind] = extractor
+        self.versions[kind] = version
+
+    def options_hash(self, engine: str) -> str:
+        # Parse-cache entries are keyed by the engine that produced the text and its version, so
+        # upgrading either one, or switching engines, does not serve text from another.
+        options = {"engine": engine, "version": self.versions[engine]}
+        return hashlib.sha256(json.dumps(options, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+    def options_hashes(self, filename: Optional[str], content_type: Optional[str], content: bytes) -> List[str]:
+        # The engines that may parse this document: its local extractor, if any, then docling.
+        kind = self.detect(filename, content_type, content) if self.enabled else None
+        return [self.options_hash(engine) for engine in (kind, "docling") if engine in self.versions]
+
+    def detect(self, filename: Optional[str], content_type: Optional[str], content: bytes) -> Optional[str]:
+        extension = filename.rsplit(".", 1)[-1].lower() if filename and "." in filename else ""
+        if content.startswith(b"%PDF-"): return "pdf"
+        if content.startswith(b"PK\x03\x04") and extension == "docx": return "docx"
+        if extension in TEXT_EXTENSIONS or (content_type or "").startswith("text/plain"): return "txt"
+        return None
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _record(self, engine: str, started_at: float) -> float:
+        parse_ms = round((time.perf_counter() - started_at) * 1000, 3)
+        metrics.counter(f"parse_engine_{engine}").inc()
+        metrics.histogram(f"parse_{engine}_ms").observe(parse_ms)
+        return parse_ms
+
+    async def _extract_local(self, kind: str, content: bytes) -> Optional[str]:
+        try: return await asyncio.get_running_loop().run_in_executor(self._executor, self.extractors[kind], content)
+        except Exception as e:
+            metrics.counter(f"parse_{kind}_errors").inc()
+            self.logger.warning(f"Local {kind} extraction failed, falling back to docling: {str(e)}")
+            return None
+
+    async def parse(self, filename: Optional[str], content_type: Optional[str], content: bytes, fallback: Callable[[], Awaitable[Optional[str]]]) -> ParseResult:
+        started_at = time.perf_counter()
+        kind = self.detect(filename, content_type, content) if self.enabled else None
+        if kind in self.extractors and (text := await self._extract_local(kind, content)):
+            return ParseResult(text=text, engine=kind, parse_ms=self._record(kind, started_at))
+        if kind in self.extractors: metrics.counter("parse_local_fallbacks").inc()
+        text = await fallback()
+        return ParseResult(text=text, engine="docling", parse_ms=self._record("docling", started_at))
+
+
+parser_engine = ParserEngine(max_workers=settings.parse_local_workers, enabled=settings.parse_local_enabled)
+parser_engine.register("pdf", extract_pdf, f"pypdfium2 {PYPDFIUM_INFO}, pdfium {PDFIUM_INFO}")
+parser_engine.register("docx", extract_docx, "1")
+parser_engine.register("txt", extract_text, "1")
@@ -0,0 +1,74 @@
+import json
+import hashlib
+from typing import Any, Dict, List, Tuple
+from jinja2 import Template
+from markupsafe import Markup
+from app.config import settings
+from app.lib.cache import LRUByteCache
+from app.lib.metrics import metrics
+from app.document.dto import DocumentData
+from app.document.templates import template_registry
+
+SECTIONS = ("basics", "skills", "experience", "education", "certificates", "projects", "achievements")
+
+
+def _hash(*parts: Any) -> str:
+    canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class PreviewRenderer:
+    def __init__(self, max_bytes: int):
+        self.fragments = LRUByteCache(max_bytes)
+        self._layouts: Dict[Tuple[str, str], Template] = {}
+        self._hits = metrics.counter("preview_fragment_hits")
+        self._misses = metrics.counter("preview_fragment_misses")
+
+    def _layout(self, template_name: str, version: str) -> Template:
+        # A child template that extends the real one and swaps every section block for its
+        # pre-rendered fragment, so only the page skeleton is rendered on each preview.
+        if (template_name, version) not in self._layouts:
+            blocks = "".join(f"{{% block {section} %}}{{{{ fragments.{section} }}}}{{% endblock %}}" for section in SECTIONS)
+            source = f'{{% extends "{template_registry.get(template_name).name}" %}}{blocks}'
+            self._layouts[(template_name, version)] = template_registry.environment.from_string(source)
+        return self._layouts[(template_name, version)]
+
+    def section_keys(self, template_name: str, data: DocumentData) -> Dict[str, str]:
+        # A section is rendered against the whole document, so its key covers every top-level
+        # field its block reads, not only the section's own data.
+        version = template_registry.version(template_name)
+        context = data.model_dump(mode="json")
+        keys = {}
+        for section in SECTIONS:
+            used = {name: context[name] for name in sorted(template_registry.variables(template_name, section)) if name in context}
+            keys[section] = _hash(template_name, version, section, used)
+        return keys
+
+    def etag(self, section_keys: Dict[str, str]) -> str:
+        return f'"{_hash(section_keys)}"'
+
+    def _render_section(self, template: Template, section: str, context: Dict[str, Any]) -> str:
+        return "".join(template.blocks[section](template.new_context(context)))
+
+    def render(self, template_name: str, data: DocumentData, section_keys: Dict[str, str]) -> Tuple[str, List[str]]:
+        template = template_registry.get(template_name)
+        version = template_registry.version(template_name)
+        context = data.model_dump()
+        fragments, rendered = {}, []
+        for section in SECTIONS:
+            cached = self.fragments.get(section_keys[section])
+            if cached is not None:
+                self._hits.inc()
+                fragments[section] = cached.decode("utf-8")
+                continue
+            self._misses.inc()
+            fragments[section] = self._render_section(template, section, context)
+            self.fragments.put(section_keys[section], fragments[section].encode("utf-8"))
+            rendered.append(section)
+        # Fragments are already-escaped template output.
+        html = self._layout(template_name, version).render(**context, fragments={section: Markup(fragment) for section, fragment in fragments.items()})
+        html = html.replace("</head>", f"<style>{template_registry.stylesheet(template_name)}</style></head>", 1)
+        return html, rendered
+
+
+preview_renderer = PreviewRenderer(max_bytes=settings.preview_fragment_cache_max_bytes)
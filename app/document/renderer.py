@@ -0,0 +1,178 @@
+import io
+import os
+import time
+import tempfile
+import asyncio
+import logging
+import multiprocessing
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException
+from app.config import settings
+from app.lib.constants import ERROR_RENDER_QUEUE_FULL
+from app.lib.metrics import metrics
+from app.document.dto import RenderStats
+from app.document.templates import TEMPLATE_DIR, template_registry
+
+
+_font_config = None
+_stylesheets: Dict[str, Tuple[str, Any]] = {}
+
+
+def _stylesheet(template_name: str) -> Any:
+    from weasyprint import CSS
+    version = template_registry.version(template_name)
+    cached = _stylesheets.get(template_name)
+    if cached is None or cached[0] != version:
+        stylesheet = CSS(string=template_registry.stylesheet(template_name), base_url=str(TEMPLATE_DIR), font_config=_font_config)
+        cached = _stylesheets[template_name] = (version, stylesheet)
+    return cached[1]
+
+
+def _warm_worker() -> None:
+    # Runs once in every worker process: pays the WeasyPrint/Pango/fontconfig import and font
+    # discovery cost, compiles the templates and parses their stylesheets up front, so renders
+    # only lay out content.
+    global _font_config
+    from weasyprint import HTML
+    from weasyprint.text.fonts import FontConfiguration
+    _font_config = FontConfiguration()
+    template_registry.load()
+    for template_name in template_registry.templates: _stylesheet(template_name)
+    HTML(string="<p>warmup</p>").write_pdf(font_config=_font_config)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _render_pdf(template_name: str, context: Dict[str, Any], spool_threshold: int) -> Union[bytes, str]:
+    # PDFs up to spool_threshold come back as bytes; larger ones are spooled to a temp file in
+    # the worker and only the path crosses the process boundary.
+    from weasyprint import HTML
+    html_content = template_registry.get(template_name).render(**context)
+    buffer = io.BytesIO()
+    HTML(string=html_content, base_url=str(TEMPLATE_DIR)).write_pdf(target=buffer, stylesheets=[_stylesheet(template_name)], font_config=_font_config)
+    if buffer.tell() <= spool_threshold: return buffer.getvalue()
+    with tempfile.NamedTemporaryFile(prefix="render-", suffix=".pdf", delete=False) as spool_file:
+        spool_file.write(buffer.getbuffer())
+        return spool_file.name
+
+
+def _rasterize_pdf(source: Union[bytes, str], pages: Optional[List[int]], dpi: int, image_format: str) -> Tuple[int, Dict[int, bytes]]:
+    import pypdfium2 as pdfium
+    document = pdfium.PdfDocument(source)
+    try:
+        page_count = len(document)
+        images = {}
+        for index in (range(page_count) if pages is None else [page for page in pages if 0 <= page < page_count]):
+            image = document[index].render(scale=dpi / 72).to_pil()
+            buffer = io.BytesIO()
+            if image_format == "webp": image.save(buffer, format="WEBP", quality=80, method=6)
+            else: image.save(buffer, format="PNG", optimize=True)
+            images[index] = buffer.getvalue()
+        return page_count, images
+    finally:
+        document.close()
+
+
+class PdfRenderer:
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, max_workers: int, max_queue_size: int, spool_threshold: int):
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.spool_threshold = spool_threshold
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(max_workers)
+        self._queued = 0
+        self._in_flight = 0
+        self._queue_depth = metrics.gauge("pdf_render_queue_depth")
+        self._queue_wait_ms = metrics.histogram("pdf_render_queue_wait_ms")
+        self._render_ms = metrics.histogram("pdf_render_ms")
+        self._rasterize_ms = metrics.histogram("pdf_rasterize_ms")
+        self._rejected = metrics.counter("pdf_render_rejected")
+
+    async def _create_executor(self) -> ProcessPoolExecutor:
+        context = multiprocessing.get_context("spawn")
+        executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context, initializer=_warm_worker)
+        loop = asyncio.get_running_loop()
+        pids = await asyncio.gather(*[loop.run_in_executor(executor, _ping) for _ in range(self.max_workers)])
+        self.logger.info(f"PDF render pool started with {len(set(pids))} warm worker(s)")
+        return executor
+
+    async def start(self) -> None:
+        # The lock keeps concurrent first calls from starting two pools.
+        async with self._executor_lock:
+            if self._executor is None: self._executor = await self._create_executor()
+
+    async def _restart(self, broken: ProcessPoolExecutor) -> None:
+        # Every call that hit the broken pool ends up here; only the first one replaces it.
+        async with self._executor_lock:
+            if self._executor is not broken: return
+            self.logger.warning("A PDF render worker died and broke the pool, starting a new one")
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = await self._create_executor()
+
+    async def _submit(self, function: Callable, *args: Any) -> Any:
+        # A crashed worker (segfault, OOM kill) leaves the pool permanently broken, so it is
+        # replaced and the call retried once; a render that keeps crashing fails on its own.
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            executor = self._executor
+            try: return await loop.run_in_executor(executor, function, *args)
+            except BrokenProcessPool:
+                await self._restart(executor)
+                if attempt: raise
+
+    def shutdown(self) -> None:
+        if self._executor is None: return
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = None
+
+    def _set_queued(self, delta: int) -> None:
+        self._queued += delta
+        self._queue_depth.set(self._queued)
+
+    async def _run(self, timings: Any, function: Callable, *args: Any) -> Any:
+        if self._executor is None: await self.start()
+        if self._queued >= self.max_queue_size:
+            self._rejected.inc()
+            raise HTTPException(status_code=503, detail=ERROR_RENDER_QUEUE_FULL, headers={"Retry-After": "5"})
+        queued_at = time.perf_counter()
+        self._set_queued(1)
+        try: await self._slots.acquire()
+        finally: self._set_queued(-1)
+        self._in_flight += 1
+        try:
+            started_at = time.perf_counter()
+            self._queue_wait_ms.observe((started_at - queued_at) * 1000)
+            result = await self._submit(function, *args)
+            timings.observe((time.perf_counter() - started_at) * 1000)
+            return result
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+
+    async def render(self, template_name: str, context: Dict[str, Any]) -> Union[bytes, str]:
+        return await self._run(self._render_ms, _render_pdf, template_name, context, self.spool_threshold)
+
+    async def rasterize(self, source: Union[bytes, str], pages: Optional[List[int]], dpi: int, image_format: str) -> Tuple[int, Dict[int, bytes]]:
+        return await self._run(self._rasterize_ms, _rasterize_pdf, source, pages, dpi, image_format)
+
+    def stats(self) -> RenderStats:
+        return RenderStats(
+            workers=self.max_workers,
+            max_queue_size=self.max_queue_size,
+            queued=self._queued,
+            in_flight=self._in_flight,
+            rejected=self._rejected.value,
+            queue_wait_ms=self._queue_wait_ms.snapshot(),
+            render_ms=self._render_ms.snapshot(),
+            rasterize_ms=self._rasterize_ms.snapshot(),
+        )
+
+
+pdf_renderer = PdfRenderer(max_workers=settings.pdf_render_workers, max_queue_size=settings.pdf_render_queue_size, spool_threshold=settings.pdf_spool_threshold_bytes)
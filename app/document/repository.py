@@ -0,0 +1,28 @@
+from sqlmodel import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database.models import ParseCache
+from app.database.repository import Repository
+
+
+class ParseCacheRepository(Repository[ParseCache]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(ParseCache, session)
+
+    async def get_by_hash(self, content_hash: str, options_hashes: list[str]) -> ParseCache | None:
+        stmt = select(ParseCache).where(ParseCache.content_hash == content_hash, ParseCache.options_hash.in_(options_hashes)).limit(1)
+        result = await self.session.exec(stmt)
+        return result.first()
+
+    async def record_hit(self, entry: ParseCache) -> None:
+        stmt = update(ParseCache).where(ParseCache.id == entry.id).values(hits=ParseCache.hits + 1)
+        await self.session.exec(stmt)
+
+    async def save(self, entry: ParseCache) -> None:
+        values = entry.model_dump(exclude={"created_at", "updated_at"})
+        stmt = insert(ParseCache).values(**values).on_conflict_do_nothing(index_elements=["content_hash", "options_hash"])
+        await self.session.exec(stmt)
+
+    async def count(self) -> int:
+        result = await self.session.exec(select(func.count()).select_from(ParseCache))
+        return result.one()
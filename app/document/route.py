@@ -1,17 +1,28 @@
 import json
+import time
+import asyncio
 import logging
-from fastapi import APIRouter, File, Request, UploadFile, BackgroundTasks, HTTPException
-from app.document.dto import DocumentData, DocumentDataOutput, ExtractDocumentRequest, GenerateDocumentRequest, RewriteDocumentInput, UploadDocumentResult
+from fastapi import APIRouter, File, Request, Response, UploadFile, HTTPException
+from app.document.dto import CompleteUploadRequest, PresignUploadRequest, PresignedUpload, BatchGenerateDocumentRequest, BatchGenerateDocumentResult, DocumentData, DocumentDataOutput, ExtractDocumentRequest, GenerateDocumentRequest, GeneratedDocumentHandle, DispatcherStats, ParseCacheStats, RenderCacheStats, RenderStats, RewriteDocumentInput, TemplateInfo, ThumbnailRequest, UploadDocumentResult
 from app.document.service import DocumentService
-from app.lib.annotations import AuthSession, TransactionSession
+from app.document.ingest import UploadBuffer
+from app.document.renderer import pdf_renderer
+from app.document.cache import render_cache, thumbnail_cache, download_handles
+from app.document.templates import template_registry
+from app.document.preview import preview_renderer
+from app.document.docling import docling_client
+from app.document.dispatcher import docling_dispatcher, extract_dispatcher
+from app.lib.http_client import HttpClientStats
+from app.document.task import cleanup_temp_file
+from starlette.background import BackgroundTask
+from fastapi.responses import HTMLResponse
+from app.lib.annotations import AuthSession, DatabaseSession, TransactionSession
 from app.lib.annotations import UageGuard
 from app.lib.limitter import limiter
-from app.lib.responses import PDF_RESPONSE_200
+from app.lib.responses import PDF_RESPONSE_200, etag_matches, parse_byte_range, stream_document, stream_range
 from app.usage.service import UsageService
 from app.session_state.service import SessionStateService
 from app.session_state.dto import SessionStateDto
-from fastapi.responses import FileResponse
-from app.document.task import cleanup_temp_file
 
 router = APIRouter(tags=["document"])
 
@@ -21,21 +32,59 @@ router = APIRouter(tags=["document"])
 async def upload_document(request: Request, session: TransactionSession, user_session: AuthSession, file: UploadFile = File(...)):
     document_service = DocumentService(session)
     session_state_service = SessionStateService(session)
-    result = await document_service.upload_document(file, user_session.user.id)
+    result = await document_service.upload_document(await UploadBuffer.from_upload(file), user_session.user.id)
+    session_state_dto = SessionStateDto(session_id=user_session.session.id, document_name=result.filename, document_url=result.file_url)
+    await session_state_service.create_or_update_session_state(session_state_dto)
+    return result
+
+
+@router.post("/upload/presign", operation_id="presignDocumentUpload", response_model=PresignedUpload)
+@limiter.limit("10/minute")
+async def presign_document_upload(request: Request, data: PresignUploadRequest, session: DatabaseSession, user_session: AuthSession):
+    document_service = DocumentService(session)
+    return await document_service.create_presigned_upload(data, user_session.user.id)
+
+
+@router.post("/upload/complete", operation_id="completeDocumentUpload", response_model=UploadDocumentResult)
+@limiter.limit("10/minute")
+async def complete_document_upload(request: Request, data: CompleteUploadRequest, session: TransactionSession, user_session: AuthSession):
+    document_service = DocumentService(session)
+    session_state_service = SessionStateService(session)
+    result = await document_service.complete_upload(data, user_session.user.id)
     session_state_dto = SessionStateDto(session_id=user_session.session.id, document_name=result.filename, document_url=result.file_url)
     await session_state_service.create_or_update_session_state(session_state_dto)
     return result
 
 
+@router.get("/download", operation_id="downloadDocument", responses={200: {"description": "Original uploaded document"}, 206: {"description": "Requested byte range of the document"}})
+@limiter.limit("60/minute")
+async def download_document(request: Request, file_key: str, session: DatabaseSession, user_session: AuthSession):
+    document_service = DocumentService(session)
+    document_service.check_document_owner(file_key, user_session.user.id)
+    document = await document_service.open_document(file_key)
+    byte_range = parse_byte_range(request.headers.get("range"), document.size)
+    body = None if document.file else document_service.iter_document(file_key, *(byte_range or (0, document.size - 1)))
+    headers = {"X-Document-Cache": "hit" if document.cache_hit else "miss", "Cache-Control": "private, max-age=3600"}
+    return stream_range(document.filename, document.content_type, document.size, byte_range, file=document.file, body=body, headers=headers)
+
+
 @router.post("/parse", operation_id="parseDocument", response_model=str)
 @limiter.limit("5/minute")
-async def parse_document(request: Request, session: TransactionSession, user_session: AuthSession, file: UploadFile = File(...)):
+async def parse_document(request: Request, response: Response, session: TransactionSession, user_session: AuthSession, file: UploadFile = File(...)):
     document_service = DocumentService(session)
     session_state_service = SessionStateService(session)
-    result = await document_service.parse_document(file)
-    session_state_dto = SessionStateDto(session_id=user_session.session.id, document_parsed=result)
+    result = await document_service.parse_document(await UploadBuffer.from_upload(file), user_session.user.id)
+    session_state_dto = SessionStateDto(session_id=user_session.session.id, document_parsed=result.text)
     await session_state_service.create_or_update_session_state(session_state_dto)
-    return result
+    response.headers["X-Parse-Engine"] = result.engine
+    response.headers["Server-Timing"] = f"parse;desc={result.engine};dur={result.parse_ms}"
+    return result.text
+
+
+@router.get("/parse-cache-stats", operation_id="getParseCacheStats", response_model=ParseCacheStats)
+async def get_parse_cache_stats(session: DatabaseSession):
+    document_service = DocumentService(session)
+    return await document_service.get_parse_cache_stats()
 
 
 @router.post("/extract", operation_id="extractDocument", response_model=DocumentData)
@@ -43,7 +92,7 @@ async def parse_document(request: Request, session: TransactionSession, user_ses
 async def extract_document(request: Request, data: ExtractDocumentRequest, session: TransactionSession, user_session: AuthSession):
     document_service = DocumentService(session)
     session_state_service = SessionStateService(session)
-    result = await document_service.extract_document(data.file_content)
+    result = await document_service.extract_document(data.file_content, user_session.user.id)
     session_state_dto = SessionStateDto(session_id=user_session.session.id, document_data=result, generated_document_data=result)
     await session_state_service.create_or_update_session_state(session_state_dto)
     return result
@@ -73,23 +122,113 @@ async def rewrite_document(request: Request, data: RewriteDocumentInput, session
 
 @router.post("/generate", operation_id="generateDocument", responses={200: PDF_RESPONSE_200})
 @limiter.limit("5/minute")
-async def generate_document(request: Request, data: GenerateDocumentRequest, session: TransactionSession, background_tasks: BackgroundTasks):
+async def generate_document(request: Request, data: GenerateDocumentRequest, session: TransactionSession):
     try:
         document_service = DocumentService(session)
-        file_name, pdf_path = await document_service.generate_document(data.template_name, data.document_data)
-        background_tasks.add_task(cleanup_temp_file, pdf_path)
-        return FileResponse(path=pdf_path, filename=file_name, media_type='application/pdf')
+        etag = document_service.get_document_etag(data.template_name, data.document_data)
+        if etag_matches(request.headers.get("if-none-match"), etag): return Response(status_code=304, headers={"ETag": etag})
+        document = await document_service.generate_document(data.template_name, data.document_data)
+        headers = {"ETag": document.etag, "X-Render-Cache": "hit" if document.cache_hit else "miss"}
+        background = BackgroundTask(cleanup_temp_file, document.path) if document.path else None
+        return stream_document(document.file_name, 'application/pdf', content=document.content, path=document.path, headers=headers, background=background)
     except Exception as e:
         logging.error(f"Failed to generate PDF: {str(e)}")
         raise
 
 
+@router.post("/thumbnail", operation_id="generateThumbnail", responses={200: {"description": "Rasterized page image", "content": {"image/png": {}, "image/webp": {}}}})
+@limiter.limit("30/minute")
+async def generate_thumbnail(request: Request, data: ThumbnailRequest, session: TransactionSession):
+    document_service = DocumentService(session)
+    etag = document_service.get_thumbnail_etag(data)
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=3600"}
+    if etag_matches(request.headers.get("if-none-match"), etag): return Response(status_code=304, headers=headers)
+    thumbnail = await document_service.generate_thumbnail(data)
+    return Response(content=thumbnail.content, media_type=thumbnail.media_type, headers={**headers, "X-Thumbnail-Cache": "hit" if thumbnail.cache_hit else "miss"})
+
+
+@router.post("/preview", operation_id="previewDocument", response_class=HTMLResponse)
+@limiter.limit("120/minute")
+async def preview_document(request: Request, data: GenerateDocumentRequest):
+    DocumentService._validate_template_name(data.template_name)
+    section_keys = preview_renderer.section_keys(data.template_name, data.document_data)
+    etag = preview_renderer.etag(section_keys)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Content-Security-Policy": "default-src 'none'; style-src 'unsafe-inline'; img-src data:"}
+    if etag_matches(request.headers.get("if-none-match"), etag): return Response(status_code=304, headers=headers)
+    html, rendered_sections = preview_renderer.render(data.template_name, data.document_data, section_keys)
+    return HTMLResponse(content=html, headers={**headers, "X-Preview-Rendered-Sections": ",".join(rendered_sections)})
+
+
+@router.post("/generate/batch", operation_id="generateDocumentBatch", response_model=BatchGenerateDocumentResult)
+@limiter.limit("5/minute")
+async def generate_document_batch(request: Request, data: BatchGenerateDocumentRequest, session: TransactionSession):
+    started_at = time.perf_counter()
+    document_service = DocumentService(session)
+    rendered = await document_service.generate_documents(data.template_names, data.document_data)
+    sizes = [document_service.get_document_size(document) for _, document in rendered]
+    handles = await asyncio.gather(*(download_handles.issue(document) for _, document in rendered))
+    documents = [GeneratedDocumentHandle(
+        template_name=template_name,
+        file_name=document.file_name,
+        download_url=str(request.url_for("download_generated_document", handle=handle)),
+        etag=document.etag,
+        size_bytes=size,
+        render_ms=document.render_ms,
+        cache_hit=document.cache_hit,
+    ) for (template_name, document), size, handle in zip(rendered, sizes, handles)]
+    total_ms = round((time.perf_counter() - started_at) * 1000, 3)
+    return BatchGenerateDocumentResult(documents=documents, expires_in=download_handles.ttl_seconds, total_ms=total_ms)
+
+
+@router.get("/generated/{handle}", operation_id="downloadGeneratedDocument", responses={200: PDF_RESPONSE_200})
+async def download_generated_document(request: Request, handle: str):
+    document = await download_handles.resolve(handle)
+    if not document: raise HTTPException(status_code=404, detail="Download link not found or expired")
+    if etag_matches(request.headers.get("if-none-match"), document.etag): return Response(status_code=304, headers={"ETag": document.etag})
+    return stream_document(document.file_name, 'application/pdf', content=document.content, path=document.path, headers={"ETag": document.etag})
+
+
+@router.get("/templates", operation_id="listTemplates", response_model=list[TemplateInfo])
+async def list_templates():
+    return template_registry.stats()
+
+
+@router.get("/render-stats", operation_id="getRenderStats", response_model=RenderStats)
+async def get_render_stats():
+    return pdf_renderer.stats()
+
+
+@router.get("/render-cache-stats", operation_id="getRenderCacheStats", response_model=RenderCacheStats)
+async def get_render_cache_stats():
+    return render_cache.stats()
+
+
+@router.get("/thumbnail-cache-stats", operation_id="getThumbnailCacheStats", response_model=RenderCacheStats)
+async def get_thumbnail_cache_stats():
+    return thumbnail_cache.stats()
+
+
+@router.get("/docling-stats", operation_id="getDoclingStats", response_model=HttpClientStats)
+async def get_docling_stats():
+    return docling_client.stats()
+
+
+@router.get("/docling-dispatcher-stats", operation_id="getDoclingDispatcherStats", response_model=DispatcherStats)
+async def get_docling_dispatcher_stats():
+    return docling_dispatcher.stats()
+
+
+@router.get("/extract-dispatcher-stats", operation_id="getExtractDispatcherStats", response_model=DispatcherStats)
+async def get_extract_dispatcher_stats():
+    return extract_dispatcher.stats()
+
+
 @router.post("/save", operation_id="saveDocument")
 @limiter.limit("30/minute")
 async def save_document(request: Request, session: TransactionSession, user_session: AuthSession, file: UploadFile = File(...)):
     document_service = DocumentService(session)
     session_state_service = SessionStateService(session)
-    result = await document_service.save_document(file, user_session.user.id)
+    result = await document_service.save_document(await UploadBuffer.from_upload(file), user_session.user.id)
     await session_state_service.create_or_update_session_state(SessionStateDto(
         session_id=user_session.session.id,
         document_name=result.filename,
@@ -1,36 +1,48 @@
 import os
-import boto3
-import aioboto3
-import tempfile
+import json
+import time
+import hashlib
+import asyncio
+import logging
+import mimetypes
+from typing import AsyncIterator, BinaryIO, Optional
 from uuid import uuid4, UUID
 from datetime import datetime
-from pathlib import Path
-from jinja2 import Environment, FileSystemLoader
-from weasyprint import HTML
 from sqlmodel.ext.asyncio.session import AsyncSession
-from fastapi import UploadFile, HTTPException
+from fastapi import HTTPException
 from app.config import settings
-from app.database.models import SessionState
-from app.document.dto import DocumentData, DocumentDataOutput, RewriteDocumentRequest, UploadDocumentResult
+from app.database import Database
+from app.database.models import ParseCache, SessionState
+from app.document.dto import DocumentData, DocumentDataOutput, ParseCacheStats, ParseResult, CompleteUploadRequest, PresignUploadRequest, PresignedUpload, StoredDocument, RenderedDocument, RewriteDocumentRequest, Thumbnail, ThumbnailRequest, UploadDocumentResult
 from app.agent.dto import DocumentDependency
 from app.agent.document_rewrite_agent import document_rewrite_agent
+from pydantic_ai.usage import RunUsage
 from app.agent.document_extract_agent import document_extract_agent
-from app.lib.http_client import HttpClient
-from app.lib.constants import TEMPLATE_MAP, ERROR_INVALID_TEMPLATE_NAME
+from app.document.docling import docling_converter, ProgressCallback
+from app.document.repository import ParseCacheRepository
+from app.document.parsers import parser_engine
+from app.document.ingest import UploadBuffer
+from app.lib.s3 import S3ClientPool, s3_pool
+from app.document.dispatcher import docling_dispatcher, extract_dispatcher, PositionCallback
+from app.lib.metrics import metrics
+from app.document.renderer import pdf_renderer
+from app.document.templates import template_registry
+from app.document.cache import render_cache, thumbnail_cache, document_cache
+from app.document.task import cleanup_temp_file
+from app.lib.responses import STREAM_CHUNK_SIZE
+from app.lib.constants import TEMPLATE_MAP, ERROR_INVALID_TEMPLATE_NAME, ALLOWED_UPLOAD_CONTENT_TYPES, ERROR_UNSUPPORTED_UPLOAD_TYPE, ERROR_UPLOAD_TOO_LARGE, ERROR_UPLOAD_NOT_FOUND, ERROR_UPLOAD_NOT_OWNED, ERROR_DOCUMENT_NOT_FOUND
 
 
 class DocumentService:
-    def __init__(self, session: AsyncSession):
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, session: AsyncSession, s3: S3ClientPool = s3_pool):
         self.session = session
-        self.access_key_id = settings.aws_access_key_id
-        self.secret_access_key = settings.aws_secret_access_key
         self.region = settings.aws_region
         self.bucket_name = settings.aws_s3_bucket
-        self.s3_client = self._create_s3_client()
-        self.docling_client = HttpClient(base_url=settings.docling_url, timeout=300.0)
-
-    def _create_s3_client(self) -> boto3.client:
-        return boto3.client('s3', aws_access_key_id=self.access_key_id, aws_secret_access_key=self.secret_access_key, region_name=self.region)
+        self.s3 = s3
+        self.docling_converter = docling_converter
+        self.parse_cache_repository = ParseCacheRepository(session)
 
     def _get_file_extension(self, filename: str) -> str:
         return filename.split('.')[-1] if '.' in filename else ''
@@ -47,53 +59,201 @@ class DocumentService:
         file_key = self._generate_file_key(filename, user_id)
         return file_key, self._generate_file_url(file_key)
 
-    def _read_file_content(self, file: UploadFile) -> bytes:
-        return file.file.read()
+    async def _abort_multipart_upload(self, s3_client, bucket_name: str, file_key: str, upload_id: str) -> None:
+        try: await s3_client.abort_multipart_upload(Bucket=bucket_name, Key=file_key, UploadId=upload_id)
+        except Exception as e: self.logger.warning(f"Failed to abort multipart upload {upload_id} for {file_key}: {str(e)}")
 
-    async def upload_document(self, file: UploadFile, user_id: UUID, bucket_name: str | None = None) -> UploadDocumentResult:
-        boto_session = aioboto3.Session()
-        bucket_name = bucket_name or self.bucket_name
-        async with boto_session.client('s3') as s3_client:
-            file_content = self._read_file_content(file)
-            file_key, file_url = self._generate_file_key_and_url(file.filename, user_id)
-            await s3_client.put_object(Bucket=bucket_name, Key=file_key, Body=file_content, ContentType=file.content_type)
-            return UploadDocumentResult(file_key=file_key, file_url=file_url, filename=file.filename, file_size=file.size, file_storage_name=file_key.split('/')[-1], content_type=file.content_type)
-
-    async def save_document(self, file: UploadFile, user_id: UUID, bucket_name: str | None = None) -> UploadDocumentResult:
-        boto_session = aioboto3.Session()
+    async def _multipart_upload(self, s3_client, bucket_name: str, file_key: str, upload: UploadBuffer) -> None:
+        # Parts are streamed from the upload; the semaphore bounds both the parts in flight and
+        # the parts held in memory, so memory stays flat whatever the file size.
+        multipart = await s3_client.create_multipart_upload(Bucket=bucket_name, Key=file_key, ContentType=upload.content_type)
+        upload_id = multipart["UploadId"]
+        slots = asyncio.Semaphore(settings.s3_multipart_concurrency)
+        tasks: list[asyncio.Task] = []
+
+        async def upload_part(part_number: int, body: bytes) -> dict:
+            try:
+                response = await s3_client.upload_part(Bucket=bucket_name, Key=file_key, UploadId=upload_id, PartNumber=part_number, Body=body)
+                return {"PartNumber": part_number, "ETag": response["ETag"]}
+            finally: slots.release()
+
+        try:
+            async for chunk in upload.chunks(settings.s3_multipart_part_size_bytes):
+                await slots.acquire()
+                for task in tasks:
+                    if task.done() and task.exception(): raise task.exception()
+                tasks.append(asyncio.create_task(upload_part(len(tasks) + 1, bytes(chunk))))
+            parts = await asyncio.gather(*tasks)
+            await s3_client.complete_multipart_upload(Bucket=bucket_name, Key=file_key, UploadId=upload_id, MultipartUpload={"Parts": parts})
+        except BaseException:
+            for task in tasks: task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await asyncio.shield(self._abort_multipart_upload(s3_client, bucket_name, file_key, upload_id))
+            raise
+
+    async def _store_document(self, upload: UploadBuffer, user_id: UUID, bucket_name: str | None = None, file_key: str | None = None) -> UploadDocumentResult:
         bucket_name = bucket_name or self.bucket_name
-        async with boto_session.client('s3') as s3_client:
-            file_content = self._read_file_content(file)
-            file_key, file_url = self._generate_file_key_and_url(file.filename, user_id)
-            await s3_client.put_object(Bucket=bucket_name, Key=file_key, Body=file_content, ContentType=file.content_type)
-            return UploadDocumentResult(file_key=file_key, file_url=file_url, filename=file.filename, file_size=file.size, file_storage_name=file_key.split('/')[-1], content_type=file.content_type)
-
-    def download_document(self, file_key: str) -> bytes:
-        try: return self.s3_client.get_object(Bucket=self.bucket_name, Key=file_key)['Body'].read()
+        s3_client = await self.s3.client()
+        file_key, file_url = (file_key, self._generate_file_url(file_key)) if file_key else self._generate_file_key_and_url(upload.filename, user_id)
+        if upload.size > settings.s3_multipart_threshold_bytes: await self._multipart_upload(s3_client, bucket_name, file_key, upload)
+        else: await s3_client.put_object(Bucket=bucket_name, Key=file_key, Body=await upload.read(), ContentType=upload.content_type)
+        return UploadDocumentResult(file_key=file_key, file_url=file_url, filename=upload.filename, file_size=upload.size, file_storage_name=file_key.split('/')[-1], content_type=upload.content_type)
+
+    async def upload_document(self, upload: UploadBuffer, user_id: UUID, bucket_name: str | None = None, file_key: str | None = None) -> UploadDocumentResult:
+        return await self._store_document(upload, user_id, bucket_name, file_key)
+
+    async def save_document(self, upload: UploadBuffer, user_id: UUID, bucket_name: str | None = None) -> UploadDocumentResult:
+        return await self._store_document(upload, user_id, bucket_name)
+
+    def _validate_upload(self, content_type: str | None, file_size: int) -> None:
+        if content_type not in ALLOWED_UPLOAD_CONTENT_TYPES: raise HTTPException(status_code=415, detail=ERROR_UNSUPPORTED_UPLOAD_TYPE.format(allowed_types=", ".join(ALLOWED_UPLOAD_CONTENT_TYPES)))
+        if file_size > settings.upload_max_bytes: raise HTTPException(status_code=413, detail=ERROR_UPLOAD_TOO_LARGE.format(max_bytes=settings.upload_max_bytes))
+
+    async def create_presigned_upload(self, request: PresignUploadRequest, user_id: UUID) -> PresignedUpload:
+        # The client POSTs the file straight to S3; the policy pins the key, content type and
+        # size range, and the original filename rides along as object metadata.
+        self._validate_upload(request.content_type, request.file_size)
+        s3_client = await self.s3.client()
+        file_key, file_url = self._generate_file_key_and_url(request.filename, user_id)
+        fields = {"Content-Type": request.content_type, "x-amz-meta-filename": request.filename}
+        conditions = [{"Content-Type": request.content_type}, {"x-amz-meta-filename": request.filename}, ["content-length-range", 1, settings.upload_max_bytes]]
+        presigned = await s3_client.generate_presigned_post(Bucket=self.bucket_name, Key=file_key, Fields=fields, Conditions=conditions, ExpiresIn=settings.upload_presign_expires_seconds)
+        return PresignedUpload(url=presigned["url"], fields=presigned["fields"], file_key=file_key, file_url=file_url, max_size=settings.upload_max_bytes, expires_in=settings.upload_presign_expires_seconds)
+
+    def check_document_owner(self, file_key: str, user_id: UUID) -> None:
+        if file_key.split('/')[1:2] != [str(user_id)]: raise HTTPException(status_code=403, detail=ERROR_UPLOAD_NOT_OWNED)
+
+    async def complete_upload(self, request: CompleteUploadRequest, user_id: UUID) -> UploadDocumentResult:
+        self.check_document_owner(request.file_key, user_id)
+        s3_client = await self.s3.client()
+        try: head = await s3_client.head_object(Bucket=self.bucket_name, Key=request.file_key)
+        except s3_client.exceptions.ClientError: raise HTTPException(status_code=404, detail=ERROR_UPLOAD_NOT_FOUND)
+        self._validate_upload(head.get("ContentType"), head["ContentLength"])
+        filename = head.get("Metadata", {}).get("filename") or request.file_key.split('/')[-1]
+        return UploadDocumentResult(file_key=request.file_key, file_url=self._generate_file_url(request.file_key), filename=filename, file_size=head["ContentLength"], file_storage_name=request.file_key.split('/')[-1], content_type=head["ContentType"])
+
+    async def cache_upload(self, upload: UploadBuffer, user_id: UUID) -> Optional[str]:
+        # Puts an upload in the local document cache under the key it is going to be stored at,
+        # so workers on this host read it from disk before it is in S3. Returns the key, or None
+        # when the upload does not fit or cannot be written.
+        if upload.size > document_cache.max_bytes: return None
+        file_key = self._generate_file_key(upload.filename, user_id)
+        temp_path = document_cache.reserve()
+        try:
+            with open(temp_path, "wb") as temp_file:
+                async for chunk in upload.chunks(STREAM_CHUNK_SIZE): await asyncio.to_thread(temp_file.write, chunk)
+            return file_key if await asyncio.to_thread(document_cache.commit, self._document_cache_key(file_key), temp_path, {"content_type": upload.content_type}) else None
+        except Exception as e:
+            cleanup_temp_file(temp_path)
+            self.logger.warning(f"Failed to cache upload {upload.filename}: {str(e)}")
+            return None
+
+    async def load_cached_document(self, file_key: str, filename: str, content_type: str | None) -> Optional[UploadBuffer]:
+        if not (entry := await asyncio.to_thread(document_cache.open_entry, self._document_cache_key(file_key))): return None
+        file, metadata = entry
+        with file: return UploadBuffer(filename, content_type or metadata.get("content_type"), await asyncio.to_thread(file.read))
+
+    async def load_document(self, upload_result: UploadDocumentResult) -> UploadBuffer:
+        return UploadBuffer(upload_result.filename, upload_result.content_type, await self.download_document(upload_result.file_key))
+
+    def _document_cache_key(self, file_key: str) -> str:
+        return hashlib.sha256(f"{self.bucket_name}/{file_key}".encode("utf-8")).hexdigest()
+
+    async def _fetch_document(self, s3_client, file_key: str, cache_key: str, content_type: str) -> BinaryIO:
+        # Streams the object into the local cache chunk by chunk, so memory stays flat. The
+        # returned handle is the one written through, so the copy stays readable whether or not
+        # it is evicted before it is served.
+        temp_path = document_cache.reserve()
+        temp_file = open(temp_path, "w+b")
+        try:
+            response = await s3_client.get_object(Bucket=self.bucket_name, Key=file_key)
+            async with response["Body"] as body:
+                async for chunk in body.iter_chunks(STREAM_CHUNK_SIZE): await asyncio.to_thread(temp_file.write, chunk)
+            await asyncio.to_thread(temp_file.flush)
+            await asyncio.to_thread(document_cache.commit, cache_key, temp_path, {"content_type": content_type})
+            temp_file.seek(0)
+            return temp_file
+        except BaseException:
+            temp_file.close()
+            cleanup_temp_file(temp_path)
+            raise
+
+    async def open_document(self, file_key: str) -> StoredDocument:
+        # Read-through: originals are served from the local LRU disk cache and fetched from S3
+        # only on a miss. Objects larger than the whole cache are streamed from S3 instead.
+        cache_key = self._document_cache_key(file_key)
+        filename = file_key.split('/')[-1]
+        content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        if entry := await asyncio.to_thread(document_cache.open_entry, cache_key):
+            metrics.counter("document_cache_hits").inc()
+            file, metadata = entry
+            return StoredDocument(file_key=file_key, filename=filename, content_type=metadata.get("content_type") or content_type, size=os.fstat(file.fileno()).st_size, file=file, cache_hit=True)
+        metrics.counter("document_cache_misses").inc()
+        s3_client = await self.s3.client()
+        try: head = await s3_client.head_object(Bucket=self.bucket_name, Key=file_key)
+        except s3_client.exceptions.ClientError: raise HTTPException(status_code=404, detail=ERROR_DOCUMENT_NOT_FOUND)
+        content_type = head.get("ContentType") or content_type
+        file = await self._fetch_document(s3_client, file_key, cache_key, content_type) if head["ContentLength"] <= document_cache.max_bytes else None
+        return StoredDocument(file_key=file_key, filename=filename, content_type=content_type, size=head["ContentLength"], file=file)
+
+    async def iter_document(self, file_key: str, first: int, last: int) -> AsyncIterator[bytes]:
+        s3_client = await self.s3.client()
+        response = await s3_client.get_object(Bucket=self.bucket_name, Key=file_key, Range=f"bytes={first}-{last}")
+        async with response["Body"] as body:
+            async for chunk in body.iter_chunks(STREAM_CHUNK_SIZE): yield chunk
+
+    async def download_document(self, file_key: str) -> bytes:
+        try:
+            document = await self.open_document(file_key)
+            if document.file:
+                with document.file as file: return await asyncio.to_thread(file.read)
+            return b"".join([chunk async for chunk in self.iter_document(file_key, 0, document.size - 1)])
+        except HTTPException: raise
         except Exception as e: raise HTTPException(status_code=500, detail=f"Failed to download document: {str(e)}")
 
-    async def parse_document(self, file: UploadFile) -> str:
+    async def _convert_with_docling(self, filename: str, file_content: bytes, content_type: str | None, on_progress: ProgressCallback | None = None) -> str | None:
+        files = {"files": (filename, file_content, content_type or "application/octet-stream")}
+        result = await self.docling_converter.convert(files, on_progress)
+        if "document" in result and result["document"]:
+            document = result["document"]
+            if text_content := document.get("text_content"): return text_content
+            if md_content := document.get("md_content"): return md_content
+            raise HTTPException(status_code=500, detail="Document conversion succeeded but no text or markdown content was returned")
+
+    async def parse_document(self, upload: UploadBuffer, user_id: UUID | None = None, on_position: PositionCallback | None = None, on_progress: ProgressCallback | None = None) -> ParseResult:
         try:
-            await file.seek(0)
-            file_content = await file.read()
-            await file.seek(0)
-            files = {"files": (file.filename, file_content, file.content_type or "application/octet-stream")}
-            response = await self.docling_client.post("/v1/convert/file", files=files, data={"to_formats": ["text"]})
-            response.raise_for_status()
-            result = response.json()
-            if "document" in result and result["document"]:
-                document = result["document"]
-                if text_content := document.get("text_content"): return text_content
-                if md_content := document.get("md_content"): return md_content
-                raise HTTPException(status_code=500, detail="Document conversion succeeded but no text or markdown content was returned")
+            started_at = time.perf_counter()
+            content = await upload.read()
+            # Parse-cache reads and writes commit in their own short transactions, so a caller's
+            # long-running transaction neither holds the entry's row lock nor rolls a new entry back.
+            async with Database.async_session() as session:
+                async with session.begin():
+                    parse_cache_repository = ParseCacheRepository(session)
+                    options_hashes = parser_engine.options_hashes(upload.filename, upload.content_type, content)
+                    if cached := await parse_cache_repository.get_by_hash(upload.sha256, options_hashes): await parse_cache_repository.record_hit(cached)
+            if cached:
+                metrics.counter("parse_cache_hits").inc()
+                return ParseResult(text=cached.text, engine="cache", parse_ms=round((time.perf_counter() - started_at) * 1000, 3))
+            metrics.counter("parse_cache_misses").inc()
+            result = await parser_engine.parse(upload.filename, upload.content_type, content, lambda: docling_dispatcher.run(str(user_id), lambda: self._convert_with_docling(upload.filename, content, upload.content_type, on_progress), on_position))
+            if result.text:
+                async with Database.async_session() as session:
+                    async with session.begin(): await ParseCacheRepository(session).save(ParseCache(content_hash=upload.sha256, options_hash=parser_engine.options_hash(result.engine), content_type=upload.content_type, file_size=upload.size, text=result.text))
+            return result
         except HTTPException: raise
         except Exception as e: raise HTTPException(status_code=500, detail=f"Failed to parse document: {str(e)}")
 
-    async def extract_document(self, file_content: str) -> DocumentData:
+    async def get_parse_cache_stats(self) -> ParseCacheStats:
+        hits, misses = metrics.counter("parse_cache_hits").value, metrics.counter("parse_cache_misses").value
+        hit_ratio = round(hits / (hits + misses), 4) if hits + misses else 0.0
+        return ParseCacheStats(entries=await self.parse_cache_repository.count(), hits=hits, misses=misses, hit_ratio=hit_ratio)
+
+    async def extract_document(self, file_content: str, user_id: UUID | None = None, usage: RunUsage | None = None, on_position: PositionCallback | None = None) -> DocumentData:
         try:
             prompt = "Extract information out of the given resume, which in a text format"
-            result = await document_extract_agent.run(user_prompt=prompt, deps=file_content)
+            result = await extract_dispatcher.run(str(user_id), lambda: document_extract_agent.run(user_prompt=prompt, deps=file_content, usage=usage), on_position)
             return result.output
+        except HTTPException: raise
         except Exception as e: raise HTTPException(status_code=500, detail=f"Failed to extract document: {str(e)}")
 
     async def rewrite_document(self, input_message: str, session_state: SessionState) -> DocumentDataOutput:
@@ -101,26 +261,57 @@ class DocumentService:
         result = await document_rewrite_agent.run(user_prompt=input_message, deps=deps)
         return result.output
 
-    async def generate_document(self, template_name: str, data: DocumentData) -> tuple[str, str]:
+    @staticmethod
+    def _validate_template_name(template_name: str) -> None:
         if template_name not in TEMPLATE_MAP:
             available_templates = ", ".join(TEMPLATE_MAP.keys())
             raise HTTPException(status_code=400, detail=ERROR_INVALID_TEMPLATE_NAME.format(available_templates=available_templates))
 
-        template_dir_name = TEMPLATE_MAP[template_name]
-        template_dir = Path(__file__).parent.parent / "lib" / "templates"
-        jinja_env = Environment(loader=FileSystemLoader(str(template_dir)))
-        template = jinja_env.get_template(f"{template_dir_name}/index.html")
+    def get_render_key(self, template_name: str, data: DocumentData) -> str:
+        self._validate_template_name(template_name)
+        return render_cache.key(template_name, template_registry.version(template_name), data)
+
+    def get_document_etag(self, template_name: str, data: DocumentData) -> str:
+        return f'"{self.get_render_key(template_name, data)}"'
+
+    async def generate_document(self, template_name: str, data: DocumentData) -> RenderedDocument:
+        started_at = time.perf_counter()
+        render_key = self.get_render_key(template_name, data)
         file_name = f"{template_name}-{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
-        temp_dir = tempfile.gettempdir()
-        pdf_path = os.path.join(temp_dir, file_name)
-        html_content = template.render(
-            basics=data.basics,
-            experience=data.experience,
-            skills=data.skills,
-            education=data.education,
-            certificates=data.certificates,
-            projects=data.projects,
-            achievements=data.achievements
-        )
-        HTML(string=html_content, base_url=str(template_dir)).write_pdf(pdf_path)
-        return file_name, pdf_path
+        output, cache_hit = await render_cache.get_or_create(render_key, lambda: pdf_renderer.render(template_name, data.model_dump()))
+        render_ms = round((time.perf_counter() - started_at) * 1000, 3)
+        if isinstance(output, bytes): return RenderedDocument(file_name=file_name, content=output, etag=f'"{render_key}"', cache_hit=cache_hit, render_ms=render_ms)
+        return RenderedDocument(file_name=file_name, path=output, etag=f'"{render_key}"', cache_hit=cache_hit, render_ms=render_ms)
+
+    async def generate_documents(self, template_names: list[str], data: DocumentData) -> list[tuple[str, RenderedDocument]]:
+        template_names = list(dict.fromkeys(template_names))
+        for template_name in template_names: self._validate_template_name(template_name)
+        documents = await asyncio.gather(*[self.generate_document(template_name, data) for template_name in template_names])
+        return list(zip(template_names, documents))
+
+    def get_thumbnail_key(self, request: ThumbnailRequest, page: int | None = None) -> str:
+        render_key = self.get_render_key(request.template_name, request.document_data)
+        options = [render_key, request.page if page is None else page, request.dpi, request.image_format]
+        return hashlib.sha256(json.dumps(options).encode("utf-8")).hexdigest()
+
+    def get_thumbnail_etag(self, request: ThumbnailRequest) -> str:
+        return f'"{self.get_thumbnail_key(request)}"'
+
+    async def _rasterize_thumbnails(self, request: ThumbnailRequest) -> bytes:
+        document = await self.generate_document(request.template_name, request.document_data)
+        pages = None if request.all_pages else [request.page - 1]
+        try: page_count, images = await pdf_renderer.rasterize(document.content if document.content is not None else document.path, pages, request.dpi, request.image_format)
+        finally:
+            if document.path: os.remove(document.path)
+        if request.page - 1 not in images: raise HTTPException(status_code=404, detail=f"Page {request.page} not found, the document has {page_count} page(s)")
+        for index, image in images.items():
+            if index != request.page - 1: await thumbnail_cache.put(self.get_thumbnail_key(request, index + 1), image)
+        return images[request.page - 1]
+
+    async def generate_thumbnail(self, request: ThumbnailRequest) -> Thumbnail:
+        thumbnail_key = self.get_thumbnail_key(request)
+        content, cache_hit = await thumbnail_cache.get_or_create(thumbnail_key, lambda: self._rasterize_thumbnails(request))
+        return Thumbnail(content=content, media_type=f"image/{request.image_format}", etag=f'"{thumbnail_key}"', cache_hit=cache_hit)
+
+    def get_document_size(self, document: RenderedDocument) -> int:
+        return len(document.content) if document.content is not None else os.path.getsize(document.path)
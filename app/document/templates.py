@@ -0,0 +1,111 @@
+import os
+import re
+import time
+import base64
+import hashlib
+import logging
+import mimetypes
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, nodes, select_autoescape
+from app.config import settings
+from app.lib.constants import TEMPLATE_MAP
+from app.document.dto import TemplateInfo
+
+TEMPLATE_DIR = Path(__file__).parent.parent / "lib" / "templates"
+STYLE_PATTERN = re.compile(r"<style[^>]*>(.*?)</style>", re.IGNORECASE | re.DOTALL)
+ASSET_PATTERN = re.compile(r"""(url\(\s*['"]?|\bsrc=['"])(?!data:|https?:|//|#|\{)([^'")\s]+)""")
+
+
+class TemplateBundleLoader(FileSystemLoader):
+    # Serves each template as a self-contained bundle: local assets are inlined as data URIs and
+    # the <style> blocks are lifted out, so renders can reuse one pre-parsed stylesheet instead
+    # of re-parsing the CSS embedded in every rendered document.
+    def __init__(self, searchpath: str):
+        super().__init__(searchpath)
+        self.stylesheets: Dict[str, str] = {}
+
+    def _inline_assets(self, text: str, base_dir: Path) -> str:
+        def replace(match: re.Match) -> str:
+            asset_path = (base_dir / match.group(2)).resolve()
+            if not asset_path.is_file(): return match.group(0)
+            mime_type = mimetypes.guess_type(asset_path.name)[0] or "application/octet-stream"
+            return f"{match.group(1)}data:{mime_type};base64,{base64.b64encode(asset_path.read_bytes()).decode()}"
+        return ASSET_PATTERN.sub(replace, text)
+
+    def get_source(self, environment: Environment, template: str) -> Tuple[str, Optional[str], Optional[Callable[[], bool]]]:
+        source, filename, uptodate = super().get_source(environment, template)
+        base_dir = Path(filename).parent if filename else Path(self.searchpath[0])
+        self.stylesheets[template] = self._inline_assets("\n".join(STYLE_PATTERN.findall(source)), base_dir)
+        return self._inline_assets(STYLE_PATTERN.sub("", source), base_dir), filename, uptodate
+
+
+class TemplateRegistry:
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, template_dir: Path, auto_reload: bool = False):
+        self.template_dir = template_dir
+        self.auto_reload = auto_reload
+        self.environment: Optional[Environment] = None
+        self.templates: Dict[str, Template] = {}
+        self.stylesheets: Dict[str, str] = {}
+        self.versions: Dict[str, str] = {}
+        self.block_variables: Dict[str, Dict[str, FrozenSet[str]]] = {}
+        self.compile_ms: Dict[str, float] = {}
+        self.loaded_at: Dict[str, datetime] = {}
+
+    def _create_environment(self) -> Environment:
+        bytecode_dir = os.path.join(settings.cache_dir, "jinja")
+        os.makedirs(bytecode_dir, exist_ok=True)
+        # Escaping is compiled into the bytecode, so escaped templates get their own cache files.
+        bytecode_cache = FileSystemBytecodeCache(bytecode_dir, "__jinja2_%s.escaped.cache")
+        return Environment(loader=TemplateBundleLoader(str(self.template_dir)), bytecode_cache=bytecode_cache, auto_reload=self.auto_reload, autoescape=select_autoescape(["html"]))
+
+    def _template_path(self, template_name: str) -> str:
+        return f"{TEMPLATE_MAP[template_name]}/index.html"
+
+    def _compile(self, template_name: str) -> Template:
+        started_at = time.perf_counter()
+        source, _, _ = self.environment.loader.get_source(self.environment, self._template_path(template_name))
+        template = self.environment.get_template(self._template_path(template_name))
+        self.templates[template_name] = template
+        stylesheet = self.environment.loader.stylesheets[self._template_path(template_name)]
+        self.stylesheets[template_name] = stylesheet
+        self.versions[template_name] = hashlib.sha256(f"{source}\n{stylesheet}".encode("utf-8")).hexdigest()[:16]
+        # The names each block reads, so a block's output can be keyed by exactly the data it uses.
+        blocks = self.environment.parse(source).find_all(nodes.Block)
+        self.block_variables[template_name] = {block.name: frozenset(node.name for node in block.find_all(nodes.Name) if node.ctx == "load") for block in blocks}
+        self.compile_ms[template_name] = round((time.perf_counter() - started_at) * 1000, 3)
+        self.loaded_at[template_name] = datetime.now(timezone.utc)
+        return template
+
+    def load(self) -> None:
+        self.environment = self._create_environment()
+        for template_name in TEMPLATE_MAP: self._compile(template_name)
+        self.logger.info(f"Compiled {len(self.templates)} template(s): {self.compile_ms}")
+
+    def get(self, template_name: str) -> Template:
+        if self.environment is None: self.load()
+        template = self.templates[template_name]
+        if self.auto_reload and not template.is_up_to_date: template = self._compile(template_name)
+        return template
+
+    def stylesheet(self, template_name: str) -> str:
+        self.get(template_name)
+        return self.stylesheets[template_name]
+
+    def version(self, template_name: str) -> str:
+        self.get(template_name)
+        return self.versions[template_name]
+
+    def variables(self, template_name: str, block: str) -> FrozenSet[str]:
+        self.get(template_name)
+        return self.block_variables[template_name].get(block, frozenset())
+
+    def stats(self) -> List[TemplateInfo]:
+        if self.environment is None: self.load()
+        return [TemplateInfo(name=name, version=self.versions[name], compile_ms=self.compile_ms[name], loaded_at=self.loaded_at[name]) for name in self.templates]
+
+
+template_registry = TemplateRegistry(TEMPLATE_DIR, auto_reload=settings.template_hot_reload)
@@ -1,23 +1,76 @@
 from enum import Enum
-from typing import Optional
+from uuid import UUID
+from datetime import datetime
+from typing import Dict, List, Optional
 from pydantic import Field
 from app.lib.model import BaseModel
+from app.lib.metrics import HistogramSnapshot
+from app.document.dto import DocumentData
 
 
 class EventStatus(str, Enum):
+    accepted = 'accepted'
     uploading = 'uploading'
+    loading = 'loading'
     saving = 'saving'
+    queued = 'queued'
     parsing = 'parsing'
+    converting = 'converting'
     extracting = 'extracting'
+    stage_completed = 'stage_completed'
     success = 'success'
     failed = 'failed'
 
 
+class StageTiming(BaseModel):
+    stage: str = Field(description="Pipeline stage: 'upload', 'load', 'parse', 'extract' or 'save'")
+    started_at: datetime = Field(description="When the stage started")
+    ended_at: Optional[datetime] = Field(default=None, description="When the stage finished, set on its stage_completed event")
+    elapsed_ms: Optional[float] = Field(default=None, description="Milliseconds since the stage started, or its total duration once finished")
+    bytes: Optional[int] = Field(default=None, description="Bytes the stage consumed")
+    tokens: Optional[int] = Field(default=None, description="LLM tokens the stage consumed")
+
+
 class EventResponse(BaseModel):
+    id: Optional[int] = Field(default=None, description="Sequence number of the event within its job, sent as the SSE event id")
     status: EventStatus = Field(description="Status of the progress event")
     data: Optional[dict] = Field(default=None, description="Optional data associated with the event")
+    timing: Optional[StageTiming] = Field(default=None, description="Timing of the stage the event belongs to")
+
+
+class BatchEventResponse(EventResponse):
+    job_id: UUID = Field(description="Job of the bulk import the event belongs to")
+    filename: Optional[str] = Field(default=None, description="Name of the document the job processes")
 
 
 class ProcessInputDto(BaseModel):
     template_name: str = Field(description="Name of the resume template to use")
     job_description: str = Field(description="Job description for tailoring the resume")
+
+
+class ProcessStoredDocumentDto(ProcessInputDto):
+    file_key: str = Field(description="Storage key of a document uploaded through a presigned URL")
+
+
+class GatewayJobDto(BaseModel):
+    id: UUID = Field(description="Job ID")
+    status: str = Field(description="Job status: 'pending', 'running', 'success' or 'failed'")
+    filename: Optional[str] = Field(default=None, description="Name of the submitted document")
+    error: Optional[str] = Field(default=None, description="Error of the last failed run")
+    last_sequence: int = Field(description="Sequence number of the latest event")
+    created_at: datetime = Field(description="When the job was submitted")
+    extracted_data: Optional[DocumentData] = Field(default=None, description="Extracted resume data once the extract stage has run")
+    events: List[EventResponse] = Field(default_factory=list, description="Events after the requested sequence number")
+
+
+class GatewayBatchDto(BaseModel):
+    batch_id: UUID = Field(description="Bulk import ID")
+    total: int = Field(description="Number of jobs in the import")
+    succeeded: int = Field(description="Jobs that finished successfully")
+    failed: int = Field(description="Jobs that failed")
+    jobs: List[GatewayJobDto] = Field(description="Jobs of the import, in submission order")
+
+
+class GatewayStageStats(BaseModel):
+    window_minutes: int = Field(description="How far back the stage_completed events were aggregated")
+    stages: Dict[str, HistogramSnapshot] = Field(description="Duration of each pipeline stage, in milliseconds")
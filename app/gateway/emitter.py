@@ -1,16 +1,43 @@
-from asyncio import Queue
-from typing import Optional
-from app.gateway.dto import EventResponse, EventStatus
+import time
+from uuid import UUID
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from app.lib.metrics import metrics
+from app.gateway.dto import EventResponse, EventStatus, StageTiming
+from app.gateway.jobs import GatewayJobManager, gateway_jobs
+
+# The stage running in the current task; pipeline stages run in their own tasks, so events from
+# concurrent stages are attributed correctly.
+_current_stage: ContextVar[Optional[tuple[StageTiming, float]]] = ContextVar("gateway_stage", default=None)
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 3)
 
 
 class ProgressEmitter:
-    def __init__(self, queue: Queue):
-        self.queue = queue
+    def __init__(self, job_id: UUID, jobs: GatewayJobManager = gateway_jobs):
+        self.job_id = job_id
+        self.jobs = jobs
 
-    async def emit(self, status: EventStatus, data: Optional[dict] = None):
-        message = EventResponse(status=status, data=data)
-        await self.queue.put(message)
+    async def emit(self, status: EventStatus, data: Optional[dict] = None, timing: Optional[StageTiming] = None) -> EventResponse:
+        if timing is None and (current := _current_stage.get()):
+            timing = current[0].model_copy(update={"elapsed_ms": _elapsed_ms(current[1])})
+        return await self.jobs.publish(self.job_id, status, data, timing)
 
-    async def close(self):
-        # Sentinel value to indicate completion
-        await self.queue.put(None)
+    @asynccontextmanager
+    async def stage(self, name: str, status: EventStatus, data: Optional[dict] = None) -> AsyncIterator[StageTiming]:
+        # Emits the stage's status on entry and stage_completed with its duration on a clean
+        # exit; the body may fill in bytes and tokens. Durations also feed a per-stage histogram.
+        timing, started = StageTiming(stage=name, started_at=datetime.now(timezone.utc)), time.perf_counter()
+        token = _current_stage.set((timing, started))
+        try:
+            await self.emit(status, data, timing.model_copy(update={"elapsed_ms": 0.0}))
+            yield timing
+        finally:
+            _current_stage.reset(token)
+        timing.ended_at, timing.elapsed_ms = datetime.now(timezone.utc), _elapsed_ms(started)
+        metrics.histogram(f"gateway_stage_{name}_ms").observe(timing.elapsed_ms)
+        await self.emit(EventStatus.stage_completed, None, timing)
@@ -0,0 +1,119 @@
+import socket
+import asyncio
+import logging
+from uuid import UUID
+from asyncio import Queue
+from typing import AsyncIterator, Dict, Optional, Set
+from sqlmodel import func, select
+from app.config import settings
+from app.database import Database
+from app.database.notify import NotificationListener, notification_listener
+from app.gateway.dto import EventResponse, EventStatus, StageTiming
+from app.database.models import GatewayJobEvent
+from app.gateway.repository import GatewayJobEventRepository, GatewayJobRepository
+
+TERMINAL_STATUSES = (EventStatus.success, EventStatus.failed)
+EVENTS_CHANNEL = "gateway_job_events"
+QUEUE_CHANNEL = "gateway_job_queue"
+UNWATCHED_CHANNEL = "gateway_job_unwatched"
+HOSTNAME = socket.gethostname()
+
+
+class GatewayJobManager:
+    # Gateway runs are persisted jobs with an ordered event log. Pipelines run in worker
+    # processes; every event is committed together with a NOTIFY carrying the job id, and API
+    # processes wake their SSE subscribers to replay the log from their last sequence. A client
+    # that reconnects with Last-Event-ID replays what it missed the same way.
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, listener: NotificationListener, poll_interval: float = 5.0):
+        self.listener = listener
+        self.poll_interval = poll_interval
+        self._subscribers: Dict[UUID, Set[Queue]] = {}
+        self._listening = False
+
+    async def publish(self, job_id: UUID, status: EventStatus, data: Optional[dict] = None, timing: Optional[StageTiming] = None) -> EventResponse:
+        timing_json = timing.model_dump(mode="json") if timing else None
+        async with Database.async_session() as session:
+            async with session.begin():
+                event = await GatewayJobEventRepository(session).append(job_id, status.value, data, timing_json)
+                await session.exec(select(func.pg_notify(EVENTS_CHANNEL, str(job_id))))
+        return EventResponse(id=event.sequence, status=status, data=data, timing=timing)
+
+    async def checkpoint(self, job_id: UUID, **values) -> None:
+        async with Database.async_session() as session:
+            async with session.begin(): await GatewayJobRepository(session).update_fields(job_id, **values)
+
+    async def touch(self, job_ids: list[UUID]) -> None:
+        async with Database.async_session() as session:
+            async with session.begin(): await GatewayJobRepository(session).touch(job_ids)
+
+    async def watch(self, job_ids: list[UUID]) -> None:
+        if not job_ids: return
+        async with Database.async_session() as session:
+            async with session.begin(): await GatewayJobRepository(session).add_watcher(job_ids)
+
+    async def unwatch(self, job_ids: list[UUID]) -> None:
+        # When a job's last stream closes, its worker is told to check on it right away rather
+        # than after the next lease renewal.
+        if not job_ids: return
+        async with Database.async_session() as session:
+            async with session.begin():
+                for job_id in await GatewayJobRepository(session).remove_watcher(job_ids): await session.exec(select(func.pg_notify(UNWATCHED_CHANNEL, str(job_id))))
+
+    async def notify_queued(self) -> None:
+        async with Database.async_session() as session:
+            async with session.begin(): await session.exec(select(func.pg_notify(QUEUE_CHANNEL, "")))
+
+    def _on_event(self, payload: str) -> None:
+        for queue in self._subscribers.get(UUID(payload), ()): queue.put_nowait(None)
+
+    async def _subscribe(self, job_id: UUID, queue: Queue) -> None:
+        if not self._listening:
+            self._listening = True
+            await self.listener.listen(EVENTS_CHANNEL, self._on_event)
+        self._subscribers.setdefault(job_id, set()).add(queue)
+
+    def _unsubscribe(self, job_id: UUID, queue: Queue) -> None:
+        subscribers = self._subscribers.get(job_id, set())
+        subscribers.discard(queue)
+        if not subscribers: self._subscribers.pop(job_id, None)
+
+    async def replay(self, job_id: UUID, last_sequence: int) -> list[EventResponse]:
+        async with Database.async_session() as session: events = await GatewayJobEventRepository(session).list_after(job_id, last_sequence)
+        return [EventResponse(id=event.sequence, status=event.status, data=event.data, timing=event.timing) for event in events]
+
+    async def _attempt(self, job_id: UUID) -> tuple[int, Optional[GatewayJobEvent]]:
+        # Where the job's current attempt starts in its log, and the latest event.
+        async with Database.async_session() as session:
+            job = await GatewayJobRepository(session).get(job_id)
+            return job.attempt_sequence, await GatewayJobEventRepository(session).get_last(job_id)
+
+    async def events(self, job_id: UUID, last_sequence: int = 0) -> AsyncIterator[EventResponse]:
+        # Subscribe before the first replay, so an event committed in between still wakes us.
+        # Notifications only say "something changed"; the log is the source of truth, and a slow
+        # poll covers notifications lost while the listener reconnects. Only a terminal event of
+        # the current attempt ends the stream: a requeued job's log still holds the failure of
+        # the attempt before it.
+        queue: Queue = Queue()
+        await self._subscribe(job_id, queue)
+        try:
+            attempt_sequence, _ = await self._attempt(job_id)
+            while True:
+                messages = await self.replay(job_id, last_sequence)
+                for message in messages:
+                    last_sequence = message.id
+                    yield message
+                    if message.status in TERMINAL_STATUSES and message.id > attempt_sequence: return
+                if not messages:
+                    # A client resuming at or past the terminal event has nothing left to wait for.
+                    attempt_sequence, last_event = await self._attempt(job_id)
+                    if last_event and last_event.status in TERMINAL_STATUSES and attempt_sequence < last_event.sequence <= last_sequence: return
+                try: await asyncio.wait_for(queue.get(), timeout=self.poll_interval)
+                except asyncio.TimeoutError: pass
+                while not queue.empty(): queue.get_nowait()
+        finally:
+            self._unsubscribe(job_id, queue)
+
+
+gateway_jobs = GatewayJobManager(notification_listener, poll_interval=settings.gateway_job_poll_interval)
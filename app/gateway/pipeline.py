@@ -0,0 +1,62 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Sequence
+
+
+class PipelineError(Exception):
+    def __init__(self, stage: str, error: BaseException):
+        super().__init__(str(error))
+        self.stage = stage
+        self.error = error
+
+
+class Stage:
+    def __init__(self, name: str, run: Callable[..., Awaitable[Any]], depends_on: Sequence[str] = ()):
+        self.name = name
+        self.run = run
+        self.depends_on = list(depends_on)
+
+
+class Pipeline:
+    # Runs stages as a dependency graph: every stage starts as soon as the stages it depends on
+    # have finished and receives their results as positional arguments, in depends_on order.
+    # The first failure cancels everything still running and is raised as a PipelineError.
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, stages: List[Stage]):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            missing = [name for name in stage.depends_on if name not in self.stages]
+            if missing: raise ValueError(f"Stage {stage.name} depends on unknown stage(s): {', '.join(missing)}")
+        self._check_acyclic()
+
+    def _check_acyclic(self) -> None:
+        visiting, done = set(), set()
+        def visit(name: str) -> None:
+            if name in done: return
+            if name in visiting: raise ValueError(f"Pipeline has a dependency cycle through stage {name}")
+            visiting.add(name)
+            for dependency in self.stages[name].depends_on: visit(dependency)
+            visiting.discard(name)
+            done.add(name)
+        for name in self.stages: visit(name)
+
+    async def run(self) -> Dict[str, Any]:
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(stage: Stage) -> Any:
+            inputs = [await tasks[dependency] for dependency in stage.depends_on]
+            try: return await stage.run(*inputs)
+            except asyncio.CancelledError: raise
+            except Exception as e: raise PipelineError(stage.name, e) from e
+
+        for name, stage in self.stages.items(): tasks[name] = asyncio.create_task(run_stage(stage), name=f"stage:{name}")
+        try:
+            done, pending = await asyncio.wait(tasks.values(), return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None: raise task.exception()
+            return {name: task.result() for name, task in tasks.items()}
+        finally:
+            pending = [task for task in tasks.values() if not task.done()]
+            for task in pending: task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
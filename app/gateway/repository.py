@@ -0,0 +1,149 @@
+from uuid import UUID
+from datetime import timedelta
+from typing import Any, Dict, Optional
+from sqlmodel import Float, and_, case, func, or_, select, update
+from sqlalchemy.orm import aliased
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database.models import GatewayJob, GatewayJobEvent, GatewayJobStatus
+from app.database.repository import Repository
+
+
+class GatewayJobRepository(Repository[GatewayJob]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(GatewayJob, session)
+
+    async def get_by_submission_key(self, submission_key: str) -> GatewayJob | None:
+        stmt = select(GatewayJob).where(GatewayJob.submission_key == submission_key)
+        result = await self.session.exec(stmt)
+        return result.first()
+
+    async def get_or_create(self, job: GatewayJob) -> tuple[GatewayJob, bool]:
+        # Concurrent submissions with the same key race on the unique index; the loser attaches
+        # to the winner's job.
+        values = job.model_dump(exclude={"created_at", "updated_at"})
+        stmt = insert(GatewayJob).values(**values).on_conflict_do_nothing(index_elements=["submission_key"]).returning(GatewayJob.id)
+        result = await self.session.exec(stmt)
+        created = result.first() is not None
+        return await self.get_by_submission_key(job.submission_key), created
+
+    async def claim_next(self, worker_id: str, host: str, lease_seconds: int, batch_concurrency: int) -> GatewayJob | None:
+        # SKIP LOCKED lets any number of workers take from the queue without blocking on each
+        # other's claims. Pending jobs are claimable once their document is stored or reserved,
+        # and bulk import jobs while their batch has fewer than batch_concurrency running (a soft
+        # cap: simultaneous claims may overshoot it briefly); running jobs once their worker
+        # stopped renewing the lease. A job whose upload is still in a host's document cache is
+        # only claimed by workers on that host.
+        running = aliased(GatewayJob)
+        batch_running = select(func.count()).select_from(running).where(running.batch_id == GatewayJob.batch_id, running.status == GatewayJobStatus.RUNNING).scalar_subquery()
+        claimable = or_(
+            and_(GatewayJob.status == GatewayJobStatus.PENDING, GatewayJob.file_key.is_not(None), or_(GatewayJob.batch_id.is_(None), batch_running < batch_concurrency)),
+            and_(GatewayJob.status == GatewayJobStatus.RUNNING, GatewayJob.lease_expires_at < func.now()),
+        )
+        local = or_(GatewayJob.upload_host.is_(None), GatewayJob.upload_host == host)
+        next_job = select(GatewayJob.id).where(claimable, local).order_by(GatewayJob.created_at).limit(1).with_for_update(skip_locked=True).scalar_subquery()
+        values = dict(status=GatewayJobStatus.RUNNING, worker_id=worker_id, lease_expires_at=func.now() + timedelta(seconds=lease_seconds), attempts=GatewayJob.attempts + 1)
+        stmt = update(GatewayJob).where(GatewayJob.id == next_job).values(**values).returning(GatewayJob)
+        result = await self.session.exec(stmt, execution_options={"synchronize_session": False})
+        return result.scalars().first()
+
+    async def fail_abandoned_uploads(self, handoff_seconds: int, error: str) -> list[UUID]:
+        # Jobs whose upload went away with the host holding it: pending ones once the host's
+        # hold lapsed, running ones once their lease has been expired for as long again without
+        # a worker on that host reclaiming them.
+        abandoned = or_(
+            and_(GatewayJob.status == GatewayJobStatus.PENDING, GatewayJob.lease_expires_at < func.now()),
+            and_(GatewayJob.status == GatewayJobStatus.RUNNING, GatewayJob.lease_expires_at < func.now() - timedelta(seconds=handoff_seconds)),
+        )
+        stmt = update(GatewayJob).where(GatewayJob.upload_host.is_not(None), abandoned).values(status=GatewayJobStatus.FAILED, error=error, worker_id=None, lease_expires_at=None).returning(GatewayJob.id)
+        result = await self.session.exec(stmt)
+        return [row[0] for row in result.all()]
+
+    async def list_by_batch(self, batch_id: UUID, user_id: UUID) -> list[GatewayJob]:
+        stmt = select(GatewayJob).where(GatewayJob.batch_id == batch_id, GatewayJob.user_id == user_id).order_by(GatewayJob.created_at)
+        result = await self.session.exec(stmt)
+        return result.all()
+
+    async def renew_lease(self, job_id: UUID, worker_id: str, lease_seconds: int) -> Optional[timedelta]:
+        # Returns how long ago a client last watched the job, by the database clock, or None
+        # when the lease has been lost.
+        stmt = update(GatewayJob).where(GatewayJob.id == job_id, GatewayJob.worker_id == worker_id, GatewayJob.status == GatewayJobStatus.RUNNING).values(lease_expires_at=func.now() + timedelta(seconds=lease_seconds)).returning(func.now() - GatewayJob.watched_at)
+        result = await self.session.exec(stmt)
+        row = result.first()
+        return row[0] if row else None
+
+    async def touch(self, job_ids: list[UUID]) -> None:
+        await self.session.exec(update(GatewayJob).where(GatewayJob.id.in_(job_ids)).values(watched_at=func.now()))
+
+    async def add_watcher(self, job_ids: list[UUID]) -> None:
+        await self.session.exec(update(GatewayJob).where(GatewayJob.id.in_(job_ids)).values(watchers=GatewayJob.watchers + 1, watched_at=func.now()))
+
+    async def remove_watcher(self, job_ids: list[UUID]) -> list[UUID]:
+        # Returns the jobs no stream follows anymore. Their watched_at is reset to the epoch, so
+        # the disconnect grace has already run out when their worker next checks.
+        last = GatewayJob.watchers <= 1
+        stmt = update(GatewayJob).where(GatewayJob.id.in_(job_ids)).values(watchers=func.greatest(GatewayJob.watchers - 1, 0), watched_at=case((last, func.to_timestamp(0)), else_=GatewayJob.watched_at)).returning(GatewayJob.id, GatewayJob.watchers)
+        result = await self.session.exec(stmt)
+        return [job_id for job_id, watchers in result.all() if watchers == 0]
+
+    async def requeue(self, job_id: UUID) -> bool:
+        # Only one resubmission moves a failed job back to the queue, or reclaims a pending one
+        # whose upload's host hold has lapsed. Events up to the current last_sequence belong to
+        # the previous attempt.
+        reclaimable = or_(GatewayJob.status == GatewayJobStatus.FAILED, and_(GatewayJob.status == GatewayJobStatus.PENDING, GatewayJob.upload_host.is_not(None), GatewayJob.lease_expires_at < func.now()))
+        stmt = update(GatewayJob).where(GatewayJob.id == job_id, reclaimable).values(status=GatewayJobStatus.PENDING, error=None, attempts=0, watched_at=func.now(), attempt_sequence=GatewayJob.last_sequence).returning(GatewayJob.id)
+        result = await self.session.exec(stmt)
+        return result.first() is not None
+
+    async def release(self, job_id: UUID, worker_id: str, handoff_seconds: int) -> None:
+        # A job handed back before its upload was stored gets a fresh host hold.
+        lease_expires_at = case((GatewayJob.upload_host.is_not(None), func.now() + timedelta(seconds=handoff_seconds)), else_=None)
+        stmt = update(GatewayJob).where(GatewayJob.id == job_id, GatewayJob.worker_id == worker_id, GatewayJob.status == GatewayJobStatus.RUNNING).values(status=GatewayJobStatus.PENDING, worker_id=None, lease_expires_at=lease_expires_at)
+        await self.session.exec(stmt)
+
+    async def update_fields(self, job_id: UUID, **values: Any) -> None:
+        await self.session.exec(update(GatewayJob).where(GatewayJob.id == job_id).values(**values))
+
+
+class GatewayJobEventRepository(Repository[GatewayJobEvent]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(GatewayJobEvent, session)
+
+    async def append(self, job_id: UUID, status: str, data: Optional[Dict[str, Any]] = None, timing: Optional[Dict[str, Any]] = None) -> GatewayJobEvent:
+        # Bumping last_sequence row-locks the job, so sequence numbers stay gapless and ordered
+        # even when several processes write to the same job.
+        stmt = update(GatewayJob).where(GatewayJob.id == job_id).values(last_sequence=GatewayJob.last_sequence + 1).returning(GatewayJob.last_sequence)
+        result = await self.session.exec(stmt)
+        event = GatewayJobEvent(job_id=job_id, sequence=result.one()[0], status=status, data=data, timing=timing)
+        return await self.create(event)
+
+    async def list_after(self, job_id: UUID, sequence: int) -> list[GatewayJobEvent]:
+        stmt = select(GatewayJobEvent).where(GatewayJobEvent.job_id == job_id, GatewayJobEvent.sequence > sequence).order_by(GatewayJobEvent.sequence)
+        result = await self.session.exec(stmt)
+        return result.all()
+
+    async def get_last(self, job_id: UUID) -> GatewayJobEvent | None:
+        stmt = select(GatewayJobEvent).where(GatewayJobEvent.job_id == job_id).order_by(GatewayJobEvent.sequence.desc()).limit(1)
+        result = await self.session.exec(stmt)
+        return result.first()
+
+    async def stage_durations(self, window_minutes: int) -> list[tuple]:
+        # Aggregated from the event log rather than in-process histograms, so the numbers cover
+        # every worker process.
+        stage = GatewayJobEvent.timing["stage"].astext.label("stage")
+        elapsed_ms = GatewayJobEvent.timing["elapsed_ms"].astext.cast(Float)
+        stmt = (
+            select(
+                stage,
+                func.count(),
+                func.avg(elapsed_ms),
+                func.percentile_cont(0.5).within_group(elapsed_ms),
+                func.percentile_cont(0.95).within_group(elapsed_ms),
+                func.percentile_cont(0.99).within_group(elapsed_ms),
+                func.max(elapsed_ms),
+            )
+            .where(GatewayJobEvent.status == "stage_completed", GatewayJobEvent.created_at >= func.now() - timedelta(minutes=window_minutes))
+            .group_by(stage)
+        )
+        result = await self.session.exec(stmt)
+        return result.all()
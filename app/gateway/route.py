@@ -1,24 +1,89 @@
-import asyncio
-from asyncio import Queue
-from fastapi import APIRouter, File, Form, UploadFile
+from uuid import UUID
+from typing import List, Optional
+from fastapi import APIRouter, File, Form, Header, Query, UploadFile
 from fastapi.responses import StreamingResponse
-from app.gateway.dto import ProcessInputDto
+from app.gateway.dto import GatewayBatchDto, GatewayJobDto, GatewayStageStats, ProcessInputDto, ProcessStoredDocumentDto
 from app.gateway.service import GatewayService
-from app.lib.annotations import AuthSession, TransactionSession
+from app.lib.annotations import AuthSession, DatabaseSession
 
 router = APIRouter(tags=['Gateway'])
 
+STREAM_HEADERS = {"Cache-Control": "no-cache", "Connection": "keep-alive", "X-Accel-Buffering": "no"}
+
+
+def _job_stream(gateway_service: GatewayService, job_id: UUID, last_sequence: int) -> StreamingResponse:
+    headers = {**STREAM_HEADERS, "X-Job-Id": str(job_id)}
+    return StreamingResponse(gateway_service.stream_job(job_id, last_sequence), media_type='text/event-stream', headers=headers)
+
 
 @router.post('/process-input-data', operation_id='processInputData')
 async def process_input_data(
-        session: TransactionSession,
+        session: DatabaseSession,
+        user_session: AuthSession,
+        template_name: str = Form(...),
+        job_description: str = Form(...),
+        file: UploadFile = File(...),
+        idempotency_key: Optional[str] = Header(default=None)):
+    gateway_service = GatewayService(session)
+    data = ProcessInputDto(template_name=template_name, job_description=job_description)
+    job, last_sequence = await gateway_service.process_input_data(file, data, user_session.user, user_session.session, idempotency_key)
+    return _job_stream(gateway_service, job.id, last_sequence)
+
+
+@router.post('/process-stored-document', operation_id='processStoredDocument')
+async def process_stored_document(session: DatabaseSession, user_session: AuthSession, data: ProcessStoredDocumentDto, idempotency_key: Optional[str] = Header(default=None)):
+    gateway_service = GatewayService(session)
+    input_data = ProcessInputDto(template_name=data.template_name, job_description=data.job_description)
+    job, last_sequence = await gateway_service.process_stored_document(data.file_key, input_data, user_session.user, user_session.session, idempotency_key)
+    return _job_stream(gateway_service, job.id, last_sequence)
+
+
+@router.post('/bulk-import', operation_id='bulkImport')
+async def bulk_import(
+        session: DatabaseSession,
         user_session: AuthSession,
         template_name: str = Form(...),
         job_description: str = Form(...),
-        file: UploadFile = File(...)):
-    queue = Queue(maxsize=10)
-    gateway_service = GatewayService(session, queue)
+        files: List[UploadFile] = File(...),
+        idempotency_key: Optional[str] = Header(default=None)):
+    gateway_service = GatewayService(session)
     data = ProcessInputDto(template_name=template_name, job_description=job_description)
-    task = asyncio.create_task(gateway_service.process_input_data(file, data, user_session.user, user_session.session))
-    stream_headers = {"Cache-Control": "no-cache", "Connection": "keep-alive", "X-Accel-Buffering": "no"}
-    return StreamingResponse(gateway_service._process_stream(task), media_type='text/event-stream', headers=stream_headers)
+    batch_id, events = gateway_service.bulk_import(files, data, user_session.user, user_session.session, idempotency_key)
+    headers = {**STREAM_HEADERS, "X-Batch-Id": str(batch_id)}
+    return StreamingResponse(events, media_type='text/event-stream', headers=headers)
+
+
+@router.get('/batches/{batch_id}', operation_id='getGatewayBatch', response_model=GatewayBatchDto)
+async def get_batch(session: DatabaseSession, user_session: AuthSession, batch_id: UUID):
+    return await GatewayService(session).get_batch(batch_id, user_session.user.id)
+
+
+@router.get('/batches/{batch_id}/events', operation_id='streamGatewayBatchEvents')
+async def stream_batch_events(session: DatabaseSession, user_session: AuthSession, batch_id: UUID):
+    gateway_service = GatewayService(session)
+    jobs = await gateway_service.get_batch_jobs(batch_id, user_session.user.id)
+    headers = {**STREAM_HEADERS, "X-Batch-Id": str(batch_id)}
+    return StreamingResponse(gateway_service.stream_batch(jobs), media_type='text/event-stream', headers=headers)
+
+
+@router.get('/jobs/{job_id}', operation_id='getGatewayJob', response_model=GatewayJobDto)
+async def get_job(session: DatabaseSession, user_session: AuthSession, job_id: UUID, after: int = Query(default=0, ge=0)):
+    return await GatewayService(session).get_job(job_id, user_session.user.id, after)
+
+
+@router.get('/jobs/{job_id}/events', operation_id='streamGatewayJobEvents')
+async def stream_job_events(
+        session: DatabaseSession,
+        user_session: AuthSession,
+        job_id: UUID,
+        last_event_id: Optional[int] = Query(default=None, ge=0),
+        last_event_id_header: Optional[int] = Header(default=None, alias='Last-Event-ID')):
+    # EventSource reconnects send Last-Event-ID; clients that cannot set headers use the query.
+    gateway_service = GatewayService(session)
+    await gateway_service.get_owned_job(job_id, user_session.user.id)
+    return _job_stream(gateway_service, job_id, last_event_id_header or last_event_id or 0)
+
+
+@router.get('/stage-stats', operation_id='getGatewayStageStats', response_model=GatewayStageStats)
+async def get_stage_stats(session: DatabaseSession, window_minutes: int = Query(default=60, ge=1, le=7 * 24 * 60)):
+    return await GatewayService(session).get_stage_stats(window_minutes)
@@ -1,97 +1,386 @@
-import asyncio
 import json
+import time
+import asyncio
+import hashlib
 import logging
-from uuid import UUID
-from asyncio import Queue, Task
-from fastapi import UploadFile
+from uuid import UUID, uuid4, uuid5
+from datetime import timedelta
+from typing import AsyncIterator, Callable, Optional
+from fastapi import HTTPException, UploadFile
+from pydantic_ai.usage import RunUsage
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database.models import Session, User
-from app.document.dto import DocumentData, UploadDocumentResult
+from app.config import settings
+from app.database import Database
+from app.database.models import GatewayJob, GatewayJobStatus, Session, User, default_time
+from app.document.dto import CompleteUploadRequest, DocumentData, UploadDocumentResult
 from app.document.service import DocumentService
-from app.gateway.dto import EventStatus, ProcessInputDto, EventResponse
+from app.document.ingest import UploadBuffer
+from app.gateway.dto import BatchEventResponse, EventResponse, EventStatus, GatewayBatchDto, GatewayJobDto, GatewayStageStats, ProcessInputDto
 from app.gateway.emitter import ProgressEmitter
+from app.gateway.jobs import HOSTNAME, gateway_jobs
+from app.gateway.pipeline import Pipeline, PipelineError, Stage
+from app.gateway.repository import GatewayJobEventRepository, GatewayJobRepository
 from app.session_state.dto import SessionStateDto
 from app.session_state.service import SessionStateService
+from app.lib.metrics import HistogramSnapshot
 from app.lib.constants import (
+    ERROR_GATEWAY_BATCH_NOT_FOUND,
+    ERROR_GATEWAY_BATCH_TOO_LARGE,
+    ERROR_GATEWAY_JOB_NOT_FOUND,
+    ERROR_GATEWAY_UPLOAD_NOT_CACHED,
     GATEWAY_QUEUE_TIMEOUT,
     GATEWAY_STREAM_CANCELLED,
     GATEWAY_ERROR_IN_STREAM,
     GATEWAY_ERROR_PROCESSING_INPUT_DATA,
 )
 
-
 class GatewayService:
+    # Each stage returns its checkpoint from the job when one exists and records it once it has
+    # run, so resubmitting a failed job resumes after the last finished stage.
     logger = logging.getLogger(__name__)
 
-    def __init__(self, session: AsyncSession, queue: Queue):
-        self.queue = queue
+    def __init__(self, session: AsyncSession, emitter: Optional[ProgressEmitter] = None):
         self.session = session
-        self.emitter = ProgressEmitter(queue)
+        self.emitter = emitter
+        self.job_repository = GatewayJobRepository(session)
         self.document_service = DocumentService(session)
         self.session_state_service = SessionStateService(session)
 
-    def _get_session_state_dto(self, upload_result: UploadDocumentResult, parsed_content: str, extracted_data: DocumentData, data: ProcessInputDto, session: Session) -> SessionStateDto:
+    def _get_session_state_dto(self, upload_result: UploadDocumentResult, parsed_content: str, extracted_data: DocumentData, job: GatewayJob) -> SessionStateDto:
         return SessionStateDto(
-            session_id=session.id,
+            session_id=job.session_id,
             document_name=upload_result.filename,
             document_url=upload_result.file_url,
             document_parsed=parsed_content,
             document_data=extracted_data,
             generated_document_data=extracted_data,
-            template_name=data.template_name,
-            job_description=data.job_description,
+            template_name=job.template_name,
+            job_description=job.job_description,
         )
 
-    async def _process_stream(self, task: Task):
-        while True:
+    def _submission_key(self, user_id: UUID, idempotency_key: Optional[str], source: str, data: ProcessInputDto, session_id: Optional[UUID] = None) -> str:
+        # A job's result is saved to the state of the session that created it, so a derived key
+        # includes the session: the same resume sent from a new session runs a new job.
+        parts = [str(user_id), idempotency_key] if idempotency_key else [str(user_id), str(session_id), source, data.template_name, data.job_description]
+        return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+    async def _checkpoint(self, job: GatewayJob, **values) -> None:
+        await gateway_jobs.checkpoint(job.id, **values)
+        for key, value in values.items(): setattr(job, key, value)
+
+    async def _watch(self, job_ids: list[UUID]) -> None:
+        if not job_ids: return
+        try: await gateway_jobs.touch(job_ids)
+        except Exception as e: self.logger.warning(f"Failed to mark gateway jobs as watched: {str(e)}")
+
+    async def _stream(self, events: AsyncIterator[EventResponse], event_id: Callable[[EventResponse], str], job_ids: list[UUID]):
+        # Heartbeat comment frames keep proxies from closing the connection during long stages.
+        # While the stream is open its jobs are marked as watched. When the last stream of a job
+        # closes, its worker cancels the run at its next check; finished stages keep their
+        # checkpoints, so resubmitting resumes it. A client that goes away without the stream
+        # noticing is covered by gateway_disconnect_grace_seconds.
+        pending: Optional[asyncio.Future] = None
+        idle_since, watched_at = time.monotonic(), time.monotonic()
+        watching = False
+        try:
+            await gateway_jobs.watch(job_ids)
+            watching = True
+            while True:
+                if time.monotonic() - watched_at >= settings.gateway_heartbeat_interval:
+                    await self._watch(job_ids)
+                    watched_at = time.monotonic()
+                pending = pending or asyncio.ensure_future(anext(events))
+                done, _ = await asyncio.wait({pending}, timeout=settings.gateway_heartbeat_interval)
+                if not done:
+                    if time.monotonic() - idle_since >= settings.gateway_stream_idle_timeout:
+                        self.logger.warning(GATEWAY_QUEUE_TIMEOUT)
+                        break
+                    yield ": heartbeat\n\n"
+                    continue
+                message, pending = pending, None
+                try: message = message.result()
+                except StopAsyncIteration: break
+                idle_since = time.monotonic()
+                yield f"id: {event_id(message)}\ndata: {message.model_dump_json()}\n\n"
+        except asyncio.CancelledError:
+            self.logger.info(GATEWAY_STREAM_CANCELLED)
+        except Exception as e:
+            self.logger.error(GATEWAY_ERROR_IN_STREAM.format(error=str(e)))
+            yield f"data: {json.dumps({'status': 'error', 'message': str(e)})}\n\n"
+        finally:
+            if pending:
+                pending.cancel()
+                await asyncio.wait({pending})
+            await events.aclose()
+            if watching:
+                try: await gateway_jobs.unwatch(job_ids)
+                except Exception as e: self.logger.warning(f"Failed to mark gateway jobs as unwatched: {str(e)}")
+
+    def stream_job(self, job_id: UUID, last_sequence: int = 0):
+        return self._stream(gateway_jobs.events(job_id, last_sequence), lambda message: str(message.id), [job_id])
+
+    async def _merge_job_events(self, jobs: AsyncIterator[GatewayJob]) -> AsyncIterator[BatchEventResponse]:
+        # Every job is followed from the moment the source yields it.
+        queue: asyncio.Queue = asyncio.Queue()
+        tasks: list[asyncio.Task] = []
+
+        async def follow(job: GatewayJob):
+            try:
+                async for message in gateway_jobs.events(job.id, job.attempt_sequence): queue.put_nowait(BatchEventResponse(**dict(message), job_id=job.id, filename=job.filename))
+            finally:
+                queue.put_nowait(None)
+
+        async def collect():
             try:
-                message = await asyncio.wait_for(self.queue.get(), timeout=60.0)
-                if message is None: break
-                if isinstance(message, EventResponse): message_json = message.model_dump_json()
-                else: message_json = json.dumps(message)
-                yield f"data: {message_json}\n\n"
-            except asyncio.TimeoutError:
-                self.logger.warning(GATEWAY_QUEUE_TIMEOUT)
-                if not task.done(): task.cancel()
-                break
-            except asyncio.CancelledError:
-                self.logger.info(GATEWAY_STREAM_CANCELLED)
-                if not task.done(): task.cancel()
-                break
-            except Exception as e:
-                self.logger.error(GATEWAY_ERROR_IN_STREAM.format(error=str(e)))
-                if not task.done(): task.cancel()
-                yield f"data: {json.dumps({'status': 'error', 'message': str(e)})}\n\n"
-                break
-
-    async def upload(self, file: UploadFile, user_id: UUID):
-        await file.seek(0)
-        await self.emitter.emit(EventStatus.uploading)
-        return await self.document_service.upload_document(file, user_id)
+                async for job in jobs: tasks.append(asyncio.create_task(follow(job)))
+            finally:
+                queue.put_nowait(None)
+
+        collector = asyncio.create_task(collect())
+        tasks.append(collector)
+        try:
+            finished = 0
+            while finished < len(tasks):
+                message = await queue.get()
+                if message is None: finished += 1
+                else: yield message
+            collector.result()
+        finally:
+            for task in tasks: task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    async def _iterate(jobs: list[GatewayJob]) -> AsyncIterator[GatewayJob]:
+        for job in jobs: yield job
+
+    def stream_batch(self, jobs: list[GatewayJob]):
+        # Every job's log is replayed from the start of its current attempt, so a retried import
+        # shows the new run rather than the previous failure; event ids are unique per job and
+        # sequence, so a reconnecting client drops the frames it already has.
+        return self._stream(self._merge_job_events(self._iterate(jobs)), lambda message: f"{message.job_id}:{message.id}", [job.id for job in jobs])
+
+    async def get_owned_job(self, job_id: UUID, user_id: UUID) -> GatewayJob:
+        job = await self.job_repository.get(job_id)
+        if not job or job.user_id != user_id: raise HTTPException(status_code=404, detail=ERROR_GATEWAY_JOB_NOT_FOUND)
+        return job
+
+    async def get_job(self, job_id: UUID, user_id: UUID, last_sequence: int = 0) -> GatewayJobDto:
+        job = await self.get_owned_job(job_id, user_id)
+        await self._watch([job.id])
+        return self._job_dto(job, await gateway_jobs.replay(job_id, last_sequence))
+
+    def _job_dto(self, job: GatewayJob, events: Optional[list[EventResponse]] = None) -> GatewayJobDto:
+        return GatewayJobDto(id=job.id, status=job.status.value, filename=job.filename, error=job.error, last_sequence=job.last_sequence, created_at=job.created_at, extracted_data=job.extracted_data, events=events or [])
+
+    async def get_batch_jobs(self, batch_id: UUID, user_id: UUID) -> list[GatewayJob]:
+        jobs = await self.job_repository.list_by_batch(batch_id, user_id)
+        if not jobs: raise HTTPException(status_code=404, detail=ERROR_GATEWAY_BATCH_NOT_FOUND)
+        return jobs
+
+    async def get_batch(self, batch_id: UUID, user_id: UUID) -> GatewayBatchDto:
+        jobs = await self.get_batch_jobs(batch_id, user_id)
+        await self._watch([job.id for job in jobs])
+        succeeded = sum(1 for job in jobs if job.status == GatewayJobStatus.SUCCESS)
+        failed = sum(1 for job in jobs if job.status == GatewayJobStatus.FAILED)
+        return GatewayBatchDto(batch_id=batch_id, total=len(jobs), succeeded=succeeded, failed=failed, jobs=[self._job_dto(job) for job in jobs])
+
+    async def get_stage_stats(self, window_minutes: int) -> GatewayStageStats:
+        rows = await GatewayJobEventRepository(self.session).stage_durations(window_minutes)
+        stages = {stage: HistogramSnapshot(count=count, mean=round(mean, 3), p50=round(p50, 3), p95=round(p95, 3), p99=round(p99, 3), max=round(maximum, 3)) for stage, count, mean, p50, p95, p99, maximum in rows}
+        return GatewayStageStats(window_minutes=window_minutes, stages=stages)
+
+    async def store(self, job: GatewayJob, upload: Optional[UploadBuffer] = None) -> UploadDocumentResult:
+        # A direct upload is stored from the submitted bytes, at the key reserved for it; a file
+        # uploaded through a presigned URL is already in S3 and only checked.
+        if job.upload_result: return UploadDocumentResult.model_validate(job.upload_result)
+        if upload is None:
+            upload_result = await self.document_service.complete_upload(CompleteUploadRequest(file_key=job.file_key), job.user_id)
+            await self._checkpoint(job, upload_result=upload_result.model_dump())
+            return upload_result
+        async with self.emitter.stage("upload", EventStatus.uploading) as timing:
+            timing.bytes = upload.size
+            upload_result = await self.document_service.upload_document(upload, job.user_id, file_key=job.file_key)
+            await self._checkpoint(job, upload_result=upload_result.model_dump(), file_key=upload_result.file_key, upload_host=None)
+        return upload_result
 
     async def save(self, data: SessionStateDto):
-        await self.emitter.emit(EventStatus.saving)
-        return await self.session_state_service.create_or_update_session_state(data)
+        async with self.emitter.stage("save", EventStatus.saving):
+            async with self.session.begin(): return await self.session_state_service.create_or_update_session_state(data)
+
+    async def _on_parse_position(self, position: int):
+        if position: await self.emitter.emit(EventStatus.queued, {"position": position, "stage": "dispatcher"})
+        else: await self.emitter.emit(EventStatus.parsing)
+
+    async def _on_extract_position(self, position: int):
+        if position: await self.emitter.emit(EventStatus.queued, {"position": position, "stage": "extract"})
+        else: await self.emitter.emit(EventStatus.extracting)
 
-    async def parse(self, file: UploadFile):
-        await file.seek(0)
-        await self.emitter.emit(EventStatus.parsing)
-        return await self.document_service.parse_document(file)
+    async def _on_parse_progress(self, task_status: str, position: Optional[int]):
+        if task_status == "pending": await self.emitter.emit(EventStatus.queued, {"position": position, "stage": "docling"})
+        elif task_status == "started": await self.emitter.emit(EventStatus.converting)
 
-    async def extract(self, parsed_content: str):
-        await self.emitter.emit(EventStatus.extracting)
-        return await self.document_service.extract_document(parsed_content)
+    async def parse(self, job: GatewayJob, upload: Optional[UploadBuffer]) -> str:
+        if job.parsed_content is not None: return job.parsed_content
+        async with self.emitter.stage("parse", EventStatus.parsing) as timing:
+            timing.bytes = upload.size
+            result = await self.document_service.parse_document(upload, job.user_id, self._on_parse_position, self._on_parse_progress)
+            self.logger.info(f"Parsed {upload.filename} with {result.engine} in {result.parse_ms}ms")
+            await self._checkpoint(job, parsed_content=result.text)
+        return result.text
 
-    async def process_input_data(self, file: UploadFile, data: ProcessInputDto, user: User, session: Session):
+    async def extract(self, job: GatewayJob, parsed_content: str) -> DocumentData:
+        if job.extracted_data is not None: return DocumentData.model_validate(job.extracted_data)
+        async with self.emitter.stage("extract", EventStatus.extracting) as timing:
+            usage = RunUsage()
+            timing.bytes = len(parsed_content.encode())
+            extracted_data = await self.document_service.extract_document(parsed_content, job.user_id, usage, self._on_extract_position)
+            timing.tokens = usage.total_tokens
+            await self._checkpoint(job, extracted_data=extracted_data.model_dump(mode="json"))
+        return extracted_data
+
+    async def load(self, job: GatewayJob, upload_result: UploadDocumentResult) -> Optional[UploadBuffer]:
+        # The stored object is only downloaded when the parse stage still has to run.
+        if job.parsed_content is not None: return None
+        async with self.emitter.stage("load", EventStatus.loading) as timing:
+            upload = await self.document_service.load_document(upload_result)
+            timing.bytes = upload.size
+        return upload
+
+    async def load_handoff(self, job: GatewayJob) -> UploadBuffer:
+        # The store stage needs the bytes even when the parse stage has its checkpoint.
+        async with self.emitter.stage("load", EventStatus.loading) as timing:
+            upload = await self.document_service.load_cached_document(job.file_key, job.filename, job.content_type)
+            if upload is None: raise HTTPException(status_code=410, detail=ERROR_GATEWAY_UPLOAD_NOT_CACHED)
+            timing.bytes = upload.size
+        return upload
+
+    async def _save_result(self, job: GatewayJob, upload_result: UploadDocumentResult, parsed_content: str, extracted_data: DocumentData):
+        return await self.save(self._get_session_state_dto(upload_result, parsed_content, extracted_data, job))
+
+    @staticmethod
+    async def run_job(job: GatewayJob) -> None:
+        # Called by a worker with a claimed, detached job. Events, stage checkpoints, parse-cache
+        # writes and the final save each commit in their own short transaction, so no connection
+        # sits idle in a transaction, or holds a row lock, while docling or the LLM runs.
+        emitter = ProgressEmitter(job.id)
+        finished = dict(worker_id=None, lease_expires_at=None)
         try:
-            upload_result = await self.upload(file, user.id)
-            parsed_content = await self.parse(file)
-            extracted_data = await self.extract(parsed_content)
-            session_state_dto = self._get_session_state_dto(upload_result, parsed_content, extracted_data, data, session)
-            await self.save(session_state_dto)
-            await self.emitter.emit(EventStatus.success)
+            async with Database.async_session() as session: await GatewayService(session, emitter)._process_job(job)
+            await gateway_jobs.checkpoint(job.id, status=GatewayJobStatus.SUCCESS, **finished)
+            await emitter.emit(EventStatus.success)
+        except PipelineError as e:
+            GatewayService.logger.error(GATEWAY_ERROR_PROCESSING_INPUT_DATA.format(error=f"{e.stage}: {str(e)}"))
+            await gateway_jobs.checkpoint(job.id, status=GatewayJobStatus.FAILED, error=str(e), **finished)
+            await emitter.emit(EventStatus.failed, {"error": str(e), "stage": e.stage})
+        except Exception as e:
+            GatewayService.logger.error(GATEWAY_ERROR_PROCESSING_INPUT_DATA.format(error=str(e)))
+            await gateway_jobs.checkpoint(job.id, status=GatewayJobStatus.FAILED, error=str(e), **finished)
+            await emitter.emit(EventStatus.failed, {"error": str(e)})
+
+    async def _store_upload(self, job: GatewayJob, upload: UploadBuffer) -> None:
+        # An upload that was not put in the document cache is stored before it is queued.
+        try: await self.store(job, upload)
         except Exception as e:
-            self.logger.error(GATEWAY_ERROR_PROCESSING_INPUT_DATA.format(error=str(e)))
-            await self.emitter.emit(EventStatus.failed, {"error": str(e)})
+            self.logger.error(GATEWAY_ERROR_PROCESSING_INPUT_DATA.format(error=f"upload: {str(e)}"))
+            await gateway_jobs.checkpoint(job.id, status=GatewayJobStatus.FAILED, error=str(e))
+            await self.emitter.emit(EventStatus.failed, {"error": str(e), "stage": "upload"})
+
+    async def _handoff(self, job: GatewayJob, upload: UploadBuffer) -> dict:
+        # A direct upload is handed to the workers of this host through the local document
+        # cache: the job is queued at once, under the key reserved for the upload, and only
+        # workers here claim it until one of them has stored it in S3, alongside parsing it.
+        # The host's hold lapses after gateway_upload_handoff_seconds; past that, the job is
+        # failed by the workers' sweep or reclaimed by a resubmission. Without embedded workers
+        # none may run on this host, so the upload is stored before it is queued instead.
+        file_key = await self.document_service.cache_upload(upload, job.user_id) if settings.gateway_embedded_workers else None
+        return dict(file_key=file_key, upload_host=HOSTNAME, lease_expires_at=default_time() + timedelta(seconds=settings.gateway_upload_handoff_seconds))
+
+    async def _submit(self, job: GatewayJob, upload: Optional[UploadBuffer] = None) -> tuple[GatewayJob, int]:
+        # New and failed jobs go (back) on the queue, resuming from their checkpoints, and stream
+        # from the current end of the log; any other submission with the same key attaches to
+        # the existing job and replays its events. Only the submission that created or requeued
+        # a job hands its upload off.
+        handoff = await self._handoff(job, upload) if upload else {}
+        for key, value in handoff.items(): setattr(job, key, value)
+        async with Database.async_session() as session:
+            async with session.begin():
+                repository = GatewayJobRepository(session)
+                job, created = await repository.get_or_create(job)
+                requeued = not created and await repository.requeue(job.id)
+                # A requeued job whose upload never made it to S3 takes over this submission's.
+                handoff = handoff if requeued and not job.upload_result else {}
+                if handoff: await repository.update_fields(job.id, **handoff)
+        if requeued: job.attempt_sequence = job.last_sequence
+        for key, value in handoff.items(): setattr(job, key, value)
+        if not created and not requeued: return job, 0
+        emitter = ProgressEmitter(job.id)
+        await emitter.emit(EventStatus.accepted, {"job_id": str(job.id)})
+        if not job.file_key: await GatewayService(self.session, emitter)._store_upload(job, upload)
+        if job.file_key: await gateway_jobs.notify_queued()
+        return job, job.last_sequence
+
+    async def _process_job(self, job: GatewayJob):
+        # A direct upload still held by this host is loaded from the document cache and stored
+        # in S3 alongside the parse; anything already in S3 is loaded from there.
+        if job.upload_host: stages = [Stage("load", lambda: self.load_handoff(job)), Stage("store", lambda upload: self.store(job, upload), ["load"])]
+        else: stages = [Stage("store", lambda: self.store(job)), Stage("load", lambda upload_result: self.load(job, upload_result), ["store"])]
+        stages += [
+            Stage("parse", lambda upload: self.parse(job, upload), ["load"]),
+            Stage("extract", lambda parsed_content: self.extract(job, parsed_content), ["parse"]),
+        ]
+        # A session holds one resume, so bulk import results stay on their jobs instead.
+        if not job.batch_id: stages.append(Stage("save", lambda upload_result, parsed_content, extracted_data: self._save_result(job, upload_result, parsed_content, extracted_data), ["store", "parse", "extract"]))
+        await Pipeline(stages).run()
+
+    async def process_input_data(self, file: UploadFile, data: ProcessInputDto, user: User, session: Session, idempotency_key: Optional[str] = None) -> tuple[GatewayJob, int]:
+        upload = await UploadBuffer.from_upload(file)
+        submission_key = self._submission_key(user.id, idempotency_key, upload.sha256, data, session.id)
+        job = GatewayJob(user_id=user.id, session_id=session.id, submission_key=submission_key, template_name=data.template_name, job_description=data.job_description, filename=upload.filename, content_type=upload.content_type)
+        return await self._submit(job, upload)
+
+    async def process_stored_document(self, file_key: str, data: ProcessInputDto, user: User, session: Session, idempotency_key: Optional[str] = None) -> tuple[GatewayJob, int]:
+        # For files uploaded straight to S3 through a presigned URL: the job is queued at once and
+        # the worker starts by loading the stored object.
+        self.document_service.check_document_owner(file_key, user.id)
+        submission_key = self._submission_key(user.id, idempotency_key, file_key, data, session.id)
+        job = GatewayJob(user_id=user.id, session_id=session.id, submission_key=submission_key, template_name=data.template_name, job_description=data.job_description, filename=file_key.split('/')[-1], file_key=file_key)
+        return await self._submit(job)
+
+    async def _submit_batch(self, batch_id: UUID, files: list[UploadFile], data: ProcessInputDto, user: User, session: Session, job_ids: list[UUID]) -> AsyncIterator[GatewayJob]:
+        # Yields each job as soon as its file is queued. Submissions run with bounded
+        # concurrency; whatever is still submitting when the stream closes is cancelled, and
+        # retrying with the same Idempotency-Key picks it up.
+        semaphore = asyncio.Semaphore(settings.gateway_batch_concurrency)
+
+        async def submit(file: UploadFile) -> GatewayJob:
+            async with semaphore:
+                upload = await UploadBuffer.from_upload(file)
+                submission_key = self._submission_key(user.id, None, f"{batch_id}:{upload.sha256}", data)
+                job = GatewayJob(user_id=user.id, session_id=session.id, submission_key=submission_key, batch_id=batch_id, template_name=data.template_name, job_description=data.job_description, filename=upload.filename, content_type=upload.content_type)
+                job, _ = await self._submit(job, upload)
+                return job
+
+        tasks = [asyncio.create_task(submit(file)) for file in files]
+        try:
+            for submission in asyncio.as_completed(tasks):
+                job = await submission
+                # The same document twice in one import is one job.
+                if job.id in job_ids: continue
+                await gateway_jobs.watch([job.id])
+                job_ids.append(job.id)
+                yield job
         finally:
-            await self.emitter.close()
+            for task in tasks: task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def bulk_import(self, files: list[UploadFile], data: ProcessInputDto, user: User, session: Session, idempotency_key: Optional[str] = None) -> tuple[UUID, AsyncIterator[str]]:
+        # Each file becomes a queued job of the batch. The batch id is returned at once and the
+        # stream follows every job from the moment its file is queued; workers cap how many of a
+        # batch's jobs run at once, and docling and the LLM are behind the same per-process,
+        # per-user admission limits as single submissions. Retrying with the same
+        # Idempotency-Key attaches to the same batch and requeues only its failed files.
+        if len(files) > settings.gateway_batch_max_files: raise HTTPException(status_code=400, detail=ERROR_GATEWAY_BATCH_TOO_LARGE.format(max_files=settings.gateway_batch_max_files))
+        batch_id = uuid5(user.id, idempotency_key) if idempotency_key else uuid4()
+        job_ids: list[UUID] = []
+        jobs = self._submit_batch(batch_id, files, data, user, session, job_ids)
+        return batch_id, self._stream(self._merge_job_events(jobs), lambda message: f"{message.job_id}:{message.id}", job_ids)
@@ -0,0 +1,186 @@
+import os
+import signal
+import asyncio
+import logging
+from uuid import UUID, uuid4
+from datetime import timedelta
+from typing import Dict, Optional, Set
+from app.config import settings
+from app.database import Database
+from app.database.models import GatewayJob, GatewayJobStatus
+from app.database.notify import NotificationListener, notification_listener
+from app.document.parsers import parser_engine
+from app.gateway.dto import EventStatus
+from app.gateway.jobs import HOSTNAME, QUEUE_CHANNEL, UNWATCHED_CHANNEL, gateway_jobs
+from app.gateway.repository import GatewayJobRepository
+from app.gateway.service import GatewayService
+from app.lib.constants import GATEWAY_JOB_ATTEMPTS_EXHAUSTED, GATEWAY_JOB_CLIENT_DISCONNECTED, GATEWAY_JOB_UPLOAD_ABANDONED
+from app.lib.http_client import HttpClient
+from app.lib.s3 import s3_pool
+
+
+class GatewayWorker:
+    # Claims queued gateway jobs and runs their pipelines, independently of the API processes
+    # that accepted them. A claimed job is leased; the lease is renewed while the pipeline runs,
+    # so a job whose worker died is reclaimed once the lease lapses and resumes from its
+    # checkpoints. On shutdown, running jobs are handed back to the queue. A job whose last
+    # event stream closed, or that no client has watched for disconnect_grace seconds, is
+    # cancelled: the in-flight LLM request and docling polling close their connections, and
+    # finished stages keep their checkpoints for a resubmission. An async docling task itself
+    # is only stopped when DOCLING_CANCEL_PATH is set. Jobs whose upload was lost with the host
+    # holding it are failed by a periodic sweep.
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, concurrency: int, lease_seconds: int, max_attempts: int, poll_interval: float, batch_concurrency: int, upload_handoff_seconds: int, disconnect_grace: Optional[float] = None, listener: NotificationListener = notification_listener):
+        self.concurrency = concurrency
+        self.batch_concurrency = batch_concurrency
+        self.disconnect_grace = timedelta(seconds=disconnect_grace) if disconnect_grace is not None else None
+        self.check_interval = min(lease_seconds / 3, 5.0)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.upload_handoff_seconds = upload_handoff_seconds
+        self.listener = listener
+        self.worker_id = f"{HOSTNAME}:{os.getpid()}:{uuid4().hex[:8]}"
+        self._wakeup = asyncio.Event()
+        self._checks: Dict[UUID, asyncio.Event] = {}
+        self._stopping = asyncio.Event()
+        self._loops: Set[asyncio.Task] = set()
+
+    def _on_queued(self, payload: str) -> None:
+        self._wakeup.set()
+
+    def _on_unwatched(self, payload: str) -> None:
+        if check := self._checks.get(UUID(payload)): check.set()
+
+    async def _claim(self) -> Optional[GatewayJob]:
+        async with Database.async_session() as session:
+            async with session.begin(): return await GatewayJobRepository(session).claim_next(self.worker_id, HOSTNAME, self.lease_seconds, self.batch_concurrency)
+
+    async def _watch(self, job: GatewayJob, run: asyncio.Task) -> Optional[str]:
+        # Returns why the run was cancelled: "lease" or "disconnected". A notification that the
+        # job's last stream closed brings the next check forward.
+        check = self._checks[job.id] = asyncio.Event()
+        try:
+            while not run.done():
+                check.clear()
+                try:
+                    async with Database.async_session() as session:
+                        async with session.begin(): unwatched_for = await GatewayJobRepository(session).renew_lease(job.id, self.worker_id, self.lease_seconds)
+                except Exception as e:
+                    self.logger.warning(f"Failed to renew the lease on gateway job {job.id}: {str(e)}")
+                    unwatched_for = timedelta(0)
+                if unwatched_for is None:
+                    self.logger.warning(f"Lost the lease on gateway job {job.id}, stopping it")
+                    run.cancel()
+                    return "lease"
+                if self.disconnect_grace is not None and unwatched_for > self.disconnect_grace:
+                    self.logger.info(f"No client is watching gateway job {job.id}, cancelling it")
+                    run.cancel()
+                    return "disconnected"
+                try: await asyncio.wait_for(check.wait(), timeout=self.check_interval)
+                except asyncio.TimeoutError: pass
+            return None
+        finally:
+            self._checks.pop(job.id, None)
+
+    async def _cancel_disconnected(self, job: GatewayJob) -> None:
+        await gateway_jobs.checkpoint(job.id, status=GatewayJobStatus.FAILED, error=GATEWAY_JOB_CLIENT_DISCONNECTED, worker_id=None, lease_expires_at=None)
+        await gateway_jobs.publish(job.id, EventStatus.failed, {"error": GATEWAY_JOB_CLIENT_DISCONNECTED, "cancelled": True})
+
+    async def _release(self, job: GatewayJob) -> None:
+        async with Database.async_session() as session:
+            async with session.begin(): await GatewayJobRepository(session).release(job.id, self.worker_id, self.upload_handoff_seconds)
+        await gateway_jobs.notify_queued()
+
+    async def _execute(self, job: GatewayJob) -> None:
+        if job.attempts > self.max_attempts:
+            # Reclaimed after its workers kept dying: likely a poison job, stop retrying it.
+            await gateway_jobs.checkpoint(job.id, status=GatewayJobStatus.FAILED, error=GATEWAY_JOB_ATTEMPTS_EXHAUSTED, worker_id=None, lease_expires_at=None)
+            await gateway_jobs.publish(job.id, EventStatus.failed, {"error": GATEWAY_JOB_ATTEMPTS_EXHAUSTED})
+            return
+        self.logger.info(f"Running gateway job {job.id} (attempt {job.attempts})")
+        run = asyncio.create_task(GatewayService.run_job(job))
+        watch = asyncio.create_task(self._watch(job, run))
+        try: await run
+        except asyncio.CancelledError:
+            # stop() sets _stopping before cancelling the loops: the worker is shutting down and
+            # hands the job back to the queue. Otherwise the watch cancelled the run because the
+            # lease was lost or the client went away.
+            if self._stopping.is_set():
+                await asyncio.shield(self._release(job))
+                raise
+            if await watch == "disconnected": await self._cancel_disconnected(job)
+        finally:
+            watch.cancel()
+
+    async def _loop(self) -> None:
+        while not self._stopping.is_set():
+            try: job = await self._claim()
+            except Exception as e:
+                self.logger.error(f"Failed to claim a gateway job: {str(e)}")
+                job = None
+            if job:
+                try: await self._execute(job)
+                except Exception as e: self.logger.error(f"Gateway job {job.id} failed in the worker: {str(e)}")
+                continue
+            self._wakeup.clear()
+            try: await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError: pass
+
+    async def _sweep(self) -> None:
+        while not self._stopping.is_set():
+            await asyncio.sleep(self.upload_handoff_seconds / 4)
+            try:
+                async with Database.async_session() as session:
+                    async with session.begin(): job_ids = await GatewayJobRepository(session).fail_abandoned_uploads(self.upload_handoff_seconds, GATEWAY_JOB_UPLOAD_ABANDONED)
+                for job_id in job_ids: await gateway_jobs.publish(job_id, EventStatus.failed, {"error": GATEWAY_JOB_UPLOAD_ABANDONED, "stage": "upload"})
+            except Exception as e: self.logger.error(f"Failed to sweep abandoned gateway uploads: {str(e)}")
+
+    async def start(self) -> None:
+        await self.listener.listen(QUEUE_CHANNEL, self._on_queued)
+        await self.listener.listen(UNWATCHED_CHANNEL, self._on_unwatched)
+        for _ in range(self.concurrency): self._loops.add(asyncio.create_task(self._loop()))
+        self._loops.add(asyncio.create_task(self._sweep()))
+        self.logger.info(f"Gateway worker {self.worker_id} started with {self.concurrency} slots")
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        self.listener.unlisten(QUEUE_CHANNEL, self._on_queued)
+        self.listener.unlisten(UNWATCHED_CHANNEL, self._on_unwatched)
+        for loop in self._loops: loop.cancel()
+        await asyncio.gather(*self._loops, return_exceptions=True)
+        self._loops.clear()
+
+
+def create_worker(concurrency: int = settings.gateway_worker_concurrency) -> GatewayWorker:
+    return GatewayWorker(
+        concurrency=concurrency,
+        lease_seconds=settings.gateway_job_lease_seconds,
+        max_attempts=settings.gateway_job_max_attempts,
+        poll_interval=settings.gateway_job_poll_interval,
+        batch_concurrency=settings.gateway_batch_concurrency,
+        upload_handoff_seconds=settings.gateway_upload_handoff_seconds,
+        disconnect_grace=settings.gateway_disconnect_grace_seconds,
+    )
+
+
+async def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    for client in HttpClient.instances: await client.start()
+    await s3_pool.start()
+    worker = create_worker()
+    stop = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT): asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+    await worker.start()
+    try: await stop.wait()
+    finally:
+        await worker.stop()
+        await notification_listener.close()
+        await HttpClient.close_all()
+        await s3_pool.close()
+        parser_engine.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,186 @@
+import os
+import json
+import asyncio
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import BinaryIO, Dict, Optional, Protocol, Tuple
+from app.config import settings
+from app.lib.s3 import s3_pool
+
+
+class CacheTier(Protocol):
+    async def get(self, key: str) -> Optional[bytes]: ...
+    async def put(self, key: str, value: bytes) -> None: ...
+
+
+class LRUByteCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None: self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes: return
+        with self._lock:
+            if key in self._entries: self.size -= len(self._entries.pop(key))
+            self._entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class DiskCache:
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, directory: str, max_bytes: int, suffix: str = ""):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.size = 0
+        self._index: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{self.suffix}"
+
+    def _metadata_path(self, key: str) -> Path:
+        return self.directory / f"{key}{self.suffix}.meta"
+
+    def _load_index(self) -> None:
+        entries = [entry for entry in os.scandir(self.directory) if entry.is_file() and entry.name.endswith(self.suffix) and not entry.name.endswith((".tmp", ".meta"))]
+        for entry in sorted(entries, key=lambda entry: entry.stat().st_atime):
+            key = entry.name[:len(entry.name) - len(self.suffix)] if self.suffix else entry.name
+            self._index[key] = entry.stat().st_size
+            self.size += entry.stat().st_size
+        self._evict()
+
+    def _evict(self) -> None:
+        while self.size > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self.size -= size
+            try:
+                self._path(key).unlink(missing_ok=True)
+                self._metadata_path(key).unlink(missing_ok=True)
+            except OSError as e: self.logger.warning(f"Failed to evict cache entry {key}: {str(e)}")
+
+    def _adopt(self, key: str) -> bool:
+        # Another process sharing the directory may have committed the entry since the index was
+        # loaded; it is taken into this process's index on first use.
+        try: size = self._path(key).stat().st_size
+        except FileNotFoundError: return False
+        with self._lock:
+            if key not in self._index:
+                self._index[key] = size
+                self.size += size
+                self._evict()
+        return True
+
+    def _touch(self, key: str) -> bool:
+        with self._lock:
+            if key in self._index:
+                self._index.move_to_end(key)
+                return True
+        return self._adopt(key)
+
+    def _read(self, key: str) -> Optional[bytes]:
+        if not self._touch(key): return None
+        try: return self._path(key).read_bytes()
+        except FileNotFoundError:
+            with self._lock:
+                if key in self._index: self.size -= self._index.pop(key)
+            return None
+
+    def open_entry(self, key: str) -> Optional[Tuple[BinaryIO, Dict[str, str]]]:
+        # The handle keeps the entry readable even if it is evicted while the caller reads it.
+        # Metadata is read before the data, which eviction removes first.
+        if not self._touch(key): return None
+        try: metadata = json.loads(self._metadata_path(key).read_text())
+        except (FileNotFoundError, ValueError): metadata = {}
+        try: return open(self._path(key), "rb"), metadata
+        except FileNotFoundError:
+            with self._lock:
+                if key in self._index: self.size -= self._index.pop(key)
+            return None
+
+    def reserve(self) -> str:
+        # A temp file inside the cache directory, so commit() is an atomic rename.
+        descriptor, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(descriptor)
+        return temp_path
+
+    def commit(self, key: str, temp_path: str, metadata: Optional[Dict[str, str]] = None) -> Optional[Path]:
+        size = os.path.getsize(temp_path)
+        if size > self.max_bytes:
+            os.remove(temp_path)
+            return None
+        # Metadata is in place before the data it describes, so a reader never pairs new data
+        # with a previous entry's metadata.
+        if metadata is None: self._metadata_path(key).unlink(missing_ok=True)
+        else:
+            metadata_path = self.reserve()
+            with open(metadata_path, "w") as metadata_file: json.dump(metadata, metadata_file)
+            os.replace(metadata_path, self._metadata_path(key))
+        os.replace(temp_path, self._path(key))
+        with self._lock:
+            if key in self._index: self.size -= self._index.pop(key)
+            self._index[key] = size
+            self.size += size
+            self._evict()
+        return self._path(key)
+
+    def _write(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes: return
+        temp_path = self.reserve()
+        with open(temp_path, "wb") as temp_file: temp_file.write(value)
+        self.commit(key, temp_path)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._read, key)
+
+    async def put(self, key: str, value: bytes) -> None:
+        await asyncio.to_thread(self._write, key, value)
+
+
+class S3Cache:
+    def __init__(self, bucket_name: str, prefix: str, content_type: str = "application/octet-stream"):
+        self.bucket_name = bucket_name
+        self.prefix = prefix.rstrip("/")
+        self.content_type = content_type
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        s3_client = await s3_pool.client()
+        try: response = await s3_client.get_object(Bucket=self.bucket_name, Key=self._key(key))
+        except s3_client.exceptions.NoSuchKey: return None
+        async with response["Body"] as body: return await body.read()
+
+    async def put(self, key: str, value: bytes) -> None:
+        s3_client = await s3_pool.client()
+        await s3_client.put_object(Bucket=self.bucket_name, Key=self._key(key), Body=value, ContentType=self.content_type)
+
+
+def create_cache_tier(backend: Optional[str], namespace: str, max_bytes: int, suffix: str = "", content_type: str = "application/octet-stream") -> Optional[CacheTier]:
+    if backend == "disk": return DiskCache(os.path.join(settings.cache_dir, namespace), max_bytes, suffix)
+    if backend == "s3": return S3Cache(settings.aws_s3_bucket, f"cache/{namespace}", content_type)
+    return None
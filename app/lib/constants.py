@@ -84,6 +84,13 @@ GATEWAY_QUEUE_TIMEOUT = "Queue timeout, ending stream"
 GATEWAY_STREAM_CANCELLED = "Stream cancelled by client"
 GATEWAY_ERROR_IN_STREAM = "Error in stream: {error}"
 GATEWAY_ERROR_PROCESSING_INPUT_DATA = "Error processing input data: {error}"
+GATEWAY_JOB_ATTEMPTS_EXHAUSTED = "Job was abandoned by its worker too many times"
+GATEWAY_JOB_CLIENT_DISCONNECTED = "Job was cancelled because no client is following it anymore; resubmit to resume"
+GATEWAY_JOB_UPLOAD_ABANDONED = "Job was abandoned before its upload was stored; resubmit the file"
+ERROR_GATEWAY_UPLOAD_NOT_CACHED = "The upload is no longer in this host's document cache; resubmit the file"
+ERROR_GATEWAY_JOB_NOT_FOUND = "Gateway job not found"
+ERROR_GATEWAY_BATCH_NOT_FOUND = "Gateway batch not found"
+ERROR_GATEWAY_BATCH_TOO_LARGE = "A bulk import accepts at most {max_files} files"
 
 # Document Templates
 TEMPLATE_MAP = {
@@ -94,3 +101,19 @@ TEMPLATE_MAP = {
 
 # Error Messages - Document Templates
 ERROR_INVALID_TEMPLATE_NAME = "Invalid template name. Available templates: {available_templates}"
+ERROR_RENDER_QUEUE_FULL = "Document rendering is busy, please retry shortly"
+ERROR_CIRCUIT_OPEN = "{name} is temporarily unavailable, please retry shortly"
+ERROR_DOCLING_QUEUE_FULL = "Document parsing is busy, please retry shortly"
+ERROR_EXTRACT_QUEUE_FULL = "Document extraction is busy, please retry shortly"
+
+# Document Uploads
+ALLOWED_UPLOAD_CONTENT_TYPES = (
+    "application/pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "text/plain",
+)
+ERROR_UNSUPPORTED_UPLOAD_TYPE = "Unsupported file type. Allowed types: {allowed_types}"
+ERROR_UPLOAD_TOO_LARGE = "File is too large, the maximum size is {max_bytes} bytes"
+ERROR_UPLOAD_NOT_FOUND = "Uploaded document not found, it may not have finished uploading"
+ERROR_UPLOAD_NOT_OWNED = "Uploaded document does not belong to the user"
+ERROR_DOCUMENT_NOT_FOUND = "Document not found"
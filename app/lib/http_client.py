@@ -1,16 +1,112 @@
+import time
 import httpx
+import asyncio
 import logging
-from typing import Any, Dict, Optional, Type, TypeVar, Union
+from typing import Any, ClassVar, Dict, List, Optional, Type, TypeVar, Union
 from fastapi import HTTPException
+from sqlmodel import Field
+from app.lib.model import BaseModel
+from app.lib.metrics import HistogramSnapshot, metrics
+from app.lib.resilience import CircuitBreaker, HedgePolicy, RetryPolicy, is_idempotent
 
 T = TypeVar("T")
 
 
+class HttpClientStats(BaseModel):
+    name: str = Field(description="Client name used as the metrics prefix")
+    base_url: Optional[str] = Field(default=None, description="Base URL the client is bound to")
+    http2: bool = Field(description="Whether HTTP/2 is negotiated when the server supports it")
+    max_connections: int = Field(description="Maximum number of pooled connections")
+    max_keepalive_connections: int = Field(description="Maximum number of idle keep-alive connections")
+    keepalive_expiry: float = Field(description="Seconds an idle connection is kept open")
+    connections: int = Field(default=0, description="Open connections in the pool")
+    idle_connections: int = Field(default=0, description="Open connections currently idle")
+    in_flight: int = Field(default=0, description="Requests currently in flight")
+    requests: int = Field(default=0, description="Requests sent since startup")
+    errors: int = Field(default=0, description="Requests that failed at the transport level")
+    retries: int = Field(default=0, description="Attempts repeated under the retry policy")
+    hedges: int = Field(default=0, description="Hedged duplicate requests sent")
+    hedge_wins: int = Field(default=0, description="Hedged duplicates that answered first")
+    circuit_state: Optional[str] = Field(default=None, description="Circuit breaker state: 'closed', 'half_open' or 'open'")
+    short_circuited: int = Field(default=0, description="Requests failed fast while the circuit was open")
+    latency_ms: HistogramSnapshot = Field(description="Latency of hedge-eligible requests in milliseconds")
+
+
 class HttpClient:
-    def __init__(self, base_url: Optional[str] = None, default_headers: Optional[Dict[str, str]] = None, timeout: float = 30.0):
+    # Owns one long-lived httpx.AsyncClient per base URL, so requests reuse pooled keep-alive
+    # connections instead of paying a TCP/TLS handshake each time. Clients are opened in the
+    # FastAPI lifespan and closed on shutdown; if used before start() they open lazily.
+    # Optional resilience policies: idempotent requests are retried with jittered backoff and
+    # hedged with a duplicate once they outlive the latency percentile, and a circuit breaker
+    # fails fast while the upstream keeps failing. Per call, idempotent= and hedge= override.
+    logger = logging.getLogger(__name__)
+    instances: ClassVar[List["HttpClient"]] = []
+
+    def __init__(self, base_url: Optional[str] = None, default_headers: Optional[Dict[str, str]] = None, timeout: float = 30.0, max_connections: int = 100, max_keepalive_connections: int = 20, keepalive_expiry: float = 5.0, http2: bool = False, name: Optional[str] = None, retry: Optional[RetryPolicy] = None, hedge: Optional[HedgePolicy] = None, breaker: Optional[CircuitBreaker] = None):
+        self.name = name or "http"
         self.base_url = base_url
         self.default_headers = default_headers or {}
         self.timeout = timeout
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections, keepalive_expiry=keepalive_expiry)
+        self.http2 = http2
+        self._client: Optional[httpx.AsyncClient] = None
+        self._in_flight = 0
+        self._requests = 0
+        self._errors = 0
+        self.retry = retry
+        self.hedge = hedge
+        self.breaker = breaker
+        self._latency_ms = metrics.histogram(f"{self.name}_latency_ms")
+        self._retries = metrics.counter(f"{self.name}_retries")
+        self._hedges = metrics.counter(f"{self.name}_hedges")
+        self._hedge_wins = metrics.counter(f"{self.name}_hedge_wins")
+        HttpClient.instances.append(self)
+
+    def _create_client(self) -> httpx.AsyncClient:
+        try: return httpx.AsyncClient(timeout=self.timeout, limits=self.limits, http2=self.http2)
+        except ImportError:
+            self.logger.warning(f"HTTP/2 requested for {self.base_url} but the h2 package is not installed, falling back to HTTP/1.1")
+            self.http2 = False
+            return httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+
+    async def start(self) -> None:
+        if self._client is None or self._client.is_closed: self._client = self._create_client()
+
+    async def close(self) -> None:
+        if self._client is not None and not self._client.is_closed: await self._client.aclose()
+        self._client = None
+
+    @classmethod
+    async def close_all(cls) -> None:
+        for instance in cls.instances: await instance.close()
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        await self.start()
+        return self._client
+
+    def stats(self) -> HttpClientStats:
+        connections = []
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        if pool is not None: connections = pool.connections
+        return HttpClientStats(
+            name=self.name,
+            base_url=self.base_url,
+            http2=self.http2,
+            max_connections=self.limits.max_connections,
+            max_keepalive_connections=self.limits.max_keepalive_connections,
+            keepalive_expiry=self.limits.keepalive_expiry,
+            connections=len(connections),
+            idle_connections=sum(1 for connection in connections if connection.is_idle()),
+            in_flight=self._in_flight,
+            requests=self._requests,
+            errors=self._errors,
+            retries=self._retries.value,
+            hedges=self._hedges.value,
+            hedge_wins=self._hedge_wins.value,
+            circuit_state=self.breaker.state if self.breaker else None,
+            short_circuited=self.breaker.short_circuited if self.breaker else 0,
+            latency_ms=self._latency_ms.snapshot(),
+        )
 
     def _parse_response(self, data: Any, response_type: Type[T]) -> T:
         if hasattr(response_type, 'model_validate'): return response_type.model_validate(data)
@@ -25,22 +121,82 @@ class HttpClient:
             else: return response_type(data)
         return data
 
-    async def _make_request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None, params: Optional[Dict[str, Any]] = None, json: Optional[Dict[str, Any]] = None, data: Optional[Union[str, bytes, Dict[str, Any]]] = None, files: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None, **kwargs) -> httpx.Response:
-        full_url = url if not self.base_url or url.startswith("http") else f"{self.base_url.rstrip('/')}/{url.lstrip('/')}"
-        merged_headers = {**self.default_headers, **(headers or {})}
-        request_timeout = timeout if timeout is not None else self.timeout
+    async def _send(self, client: httpx.AsyncClient, method: str, full_url: str, observe: bool, **kwargs) -> httpx.Response:
+        started_at = time.perf_counter()
+        self._requests += 1
+        self._in_flight += 1
         try:
-            async with httpx.AsyncClient(timeout=request_timeout) as client:
-                return await client.request(method=method, url=full_url, headers=merged_headers, params=params, json=json, data=data, files=files, **kwargs)
+            response = await client.request(method=method, url=full_url, **kwargs)
+            if observe: self._latency_ms.observe((time.perf_counter() - started_at) * 1000)
+            return response
         except httpx.TimeoutException as e:
+            self._errors += 1
             logging.error(f"Request timeout: {method} {full_url}")
             raise HTTPException(status_code=504, detail=f"Request timeout: {str(e)}")
         except httpx.RequestError as e:
+            self._errors += 1
             logging.error(f"Request error: {method} {full_url} - {str(e)}")
             raise HTTPException(status_code=503, detail=f"Request failed: {str(e)}")
         except Exception as e:
+            self._errors += 1
             logging.error(f"Unexpected error: {method} {full_url} - {str(e)}")
             raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+        finally:
+            self._in_flight -= 1
+
+    def _hedge_delay(self) -> Optional[float]:
+        if self.hedge is None or self._latency_ms.count < self.hedge.min_samples: return None
+        return max(self.hedge.min_delay, self._latency_ms.percentile(self.hedge.percentile) / 1000)
+
+    async def _send_hedged(self, delay: float, client: httpx.AsyncClient, method: str, full_url: str, **kwargs) -> httpx.Response:
+        primary = asyncio.ensure_future(self._send(client, method, full_url, True, **kwargs))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done: return primary.result()
+            self._hedges.inc()
+            hedged = asyncio.ensure_future(self._send(client, method, full_url, True, **kwargs))
+            pending.add(hedged)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None: continue
+                    if task is hedged: self._hedge_wins.inc()
+                    return task.result()
+            return primary.result() if primary.exception() is None else hedged.result()
+        finally:
+            for task in pending: task.cancel()
+
+    async def _make_request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None, params: Optional[Dict[str, Any]] = None, json: Optional[Dict[str, Any]] = None, data: Optional[Union[str, bytes, Dict[str, Any]]] = None, files: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None, idempotent: Optional[bool] = None, hedge: bool = True, **kwargs) -> httpx.Response:
+        full_url = url if not self.base_url or url.startswith("http") else f"{self.base_url.rstrip('/')}/{url.lstrip('/')}"
+        merged_headers = {**self.default_headers, **(headers or {})}
+        request_timeout = timeout if timeout is not None else self.timeout
+        client = await self._get_client()
+        request_kwargs = dict(headers=merged_headers, params=params, json=json, data=data, files=files, timeout=request_timeout, **kwargs)
+        idempotent = is_idempotent(method, idempotent)
+        attempts = self.retry.max_attempts if self.retry and idempotent else 1
+        for attempt in range(1, attempts + 1):
+            if self.breaker: self.breaker.before_request()
+            try:
+                delay = self._hedge_delay() if hedge and idempotent else None
+                if delay is not None: response = await self._send_hedged(delay, client, method, full_url, **request_kwargs)
+                else: response = await self._send(client, method, full_url, hedge and idempotent, **request_kwargs)
+            except HTTPException as e:
+                if self.breaker and e.status_code != 500: self.breaker.record_failure()
+                elif self.breaker: self.breaker.release_probe()
+                if attempt == attempts or e.status_code == 500: raise
+                self._retries.inc()
+                await asyncio.sleep(self.retry.backoff(attempt))
+                continue
+            except BaseException:
+                if self.breaker: self.breaker.release_probe()
+                raise
+            if self.breaker and response.status_code >= 500: self.breaker.record_failure()
+            elif self.breaker: self.breaker.record_success()
+            if attempt == attempts or response.status_code not in self.retry.retry_status_codes: return response
+            await response.aclose()
+            self._retries.inc()
+            await asyncio.sleep(self.retry.backoff(attempt))
 
     async def get(self, url: str, headers: Optional[Dict[str, str]] = None, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None, **kwargs) -> httpx.Response:
         return await self._make_request("GET", url, headers=headers, params=params, timeout=timeout, **kwargs)
@@ -0,0 +1,81 @@
+import threading
+from collections import deque
+from typing import Dict
+from sqlmodel import Field
+from app.lib.model import BaseModel
+
+
+class HistogramSnapshot(BaseModel):
+    count: int = Field(default=0, description="Number of observations since startup")
+    mean: float = Field(default=0.0, description="Mean of the sampled observations")
+    p50: float = Field(default=0.0, description="50th percentile of the sampled observations")
+    p95: float = Field(default=0.0, description="95th percentile of the sampled observations")
+    p99: float = Field(default=0.0, description="99th percentile of the sampled observations")
+    max: float = Field(default=0.0, description="Largest sampled observation")
+
+
+def _percentile(samples: list[float], percentile: float) -> float:
+    if not samples: return 0.0
+    index = min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))
+    return round(samples[index], 3)
+
+
+class Histogram:
+    def __init__(self, name: str, window: int = 1024):
+        self.name = name
+        self.count = 0
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.count += 1
+            self._samples.append(value)
+
+    def percentile(self, percentile: float) -> float:
+        with self._lock: samples = sorted(self._samples)
+        return _percentile(samples, percentile)
+
+    def snapshot(self) -> HistogramSnapshot:
+        with self._lock: samples, count = sorted(self._samples), self.count
+        if not samples: return HistogramSnapshot(count=count)
+        mean = round(sum(samples) / len(samples), 3)
+        return HistogramSnapshot(count=count, mean=mean, p50=_percentile(samples, 50), p95=_percentile(samples, 95), p99=_percentile(samples, 99), max=round(samples[-1], 3))
+
+
+class Counter:
+    def __init__(self, name: str):
+        self.name = name
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock: self.value += amount
+
+
+class Gauge:
+    def __init__(self, name: str):
+        self.name = name
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, Counter] = {}
+        self.gauges: Dict[str, Gauge] = {}
+
+    def histogram(self, name: str, window: int = 1024) -> Histogram:
+        return self.histograms.setdefault(name, Histogram(name, window))
+
+    def counter(self, name: str) -> Counter:
+        return self.counters.setdefault(name, Counter(name))
+
+    def gauge(self, name: str) -> Gauge:
+        return self.gauges.setdefault(name, Gauge(name))
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,91 @@
+import time
+import random
+import logging
+from typing import Optional, Tuple
+from fastapi import HTTPException
+from app.lib.constants import ERROR_CIRCUIT_OPEN
+from app.lib.metrics import metrics
+
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+RETRYABLE_STATUS_CODES = (502, 503, 504)
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts: int = 3, backoff_base: float = 0.2, backoff_max: float = 5.0, retry_status_codes: Tuple[int, ...] = RETRYABLE_STATUS_CODES):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_status_codes = retry_status_codes
+
+    def backoff(self, attempt: int) -> float:
+        # Full jitter: a random delay up to the exponential cap, so retries from many callers spread out.
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+
+class HedgePolicy:
+    def __init__(self, percentile: float = 95.0, min_delay: float = 0.05, min_samples: int = 20):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+
+
+class CircuitBreaker:
+    # closed: requests flow and consecutive failures are counted. open: requests fail fast until
+    # recovery_timeout passes. half_open: a single probe is let through; its outcome closes or
+    # re-opens the circuit.
+    logger = logging.getLogger(__name__)
+    STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._state_gauge = metrics.gauge(f"{name}_circuit_state")
+        self._short_circuited = metrics.counter(f"{name}_circuit_short_circuited")
+        self._opened = metrics.counter(f"{name}_circuit_opened")
+
+    @property
+    def short_circuited(self) -> int:
+        return self._short_circuited.value
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state: self.logger.warning(f"Circuit {self.name} {self.state} -> {state}")
+        self.state = state
+        self._state_gauge.set(self.STATES[state])
+
+    def retry_after(self) -> int:
+        return max(1, int(self._opened_at + self.recovery_timeout - time.monotonic()))
+
+    def before_request(self) -> None:
+        if self.state == "open" and time.monotonic() - self._opened_at >= self.recovery_timeout: self._set_state("half_open")
+        if self.state == "closed": return
+        if self.state == "half_open" and not self._probing:
+            self._probing = True
+            return
+        self._short_circuited.inc()
+        raise HTTPException(status_code=503, detail=ERROR_CIRCUIT_OPEN.format(name=self.name), headers={"Retry-After": str(self.retry_after())})
+
+    def release_probe(self) -> None:
+        self._probing = False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._probing = False
+        self._set_state("closed")
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        probe_failed = self.state == "half_open"
+        self._probing = False
+        if probe_failed or self._failures >= self.failure_threshold:
+            if self.state != "open": self._opened.inc()
+            self._opened_at = time.monotonic()
+            self._set_state("open")
+
+
+def is_idempotent(method: str, idempotent: Optional[bool]) -> bool:
+    return idempotent if idempotent is not None else method.upper() in IDEMPOTENT_METHODS
@@ -1,3 +1,12 @@
+import os
+from typing import AsyncIterator, BinaryIO, Dict, Iterator, Optional, Tuple, Union
+from urllib.parse import quote
+from starlette.background import BackgroundTask
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
 PDF_RESPONSE_200 = {
     "description": "Generated PDF document",
@@ -10,3 +19,58 @@ PDF_RESPONSE_200 = {
         }
     }
 }
+
+
+def content_disposition(filename: str, disposition: str = "attachment") -> str:
+    ascii_name = filename.encode("ascii", "ignore").decode().replace('"', "") or "download"
+    return f"{disposition}; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename)}"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match uses weak comparison: W/ prefixes are ignored and "*" matches any etag.
+    if not if_none_match: return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def _iter_bytes(content: bytes) -> Iterator[bytes]:
+    view = memoryview(content)
+    for offset in range(0, len(view), STREAM_CHUNK_SIZE): yield view[offset:offset + STREAM_CHUNK_SIZE]
+
+
+def _iter_file(source: Union[str, BinaryIO], start: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+    # An already open file is read and closed like one opened from a path.
+    with open(source, "rb") if isinstance(source, str) else source as file:
+        file.seek(start)
+        remaining = length if length is not None else float("inf")
+        while remaining > 0 and (chunk := file.read(int(min(STREAM_CHUNK_SIZE, remaining)))):
+            remaining -= len(chunk)
+            yield chunk
+
+
+def parse_byte_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    # A single "bytes=start-end", "bytes=start-" or "bytes=-suffix" range; anything else
+    # (multiple ranges, other units, malformed values) is ignored and the whole body is served.
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header: return None
+    start, _, end = range_header[len("bytes="):].strip().partition("-")
+    try:
+        if not start: first, last = max(0, size - int(end)), size - 1
+        else: first, last = int(start), min(int(end), size - 1) if end else size - 1
+    except ValueError: return None
+    if first > last or first >= size: raise HTTPException(status_code=416, detail="Requested range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return first, last
+
+
+def stream_range(filename: str, media_type: str, size: int, byte_range: Optional[Tuple[int, int]], file: Optional[BinaryIO] = None, body: Optional[Union[Iterator[bytes], AsyncIterator[bytes]]] = None, headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    first, last = byte_range or (0, size - 1)
+    if body is None: body = _iter_file(file, first, last - first + 1)
+    response_headers = {"Accept-Ranges": "bytes", "Content-Length": str(last - first + 1), "Content-Disposition": content_disposition(filename), **(headers or {})}
+    if byte_range: response_headers["Content-Range"] = f"bytes {first}-{last}/{size}"
+    return StreamingResponse(body, status_code=206 if byte_range else 200, media_type=media_type, headers=response_headers)
+
+
+def stream_document(filename: str, media_type: str, content: Optional[bytes] = None, path: Optional[str] = None, headers: Optional[Dict[str, str]] = None, background: Optional[BackgroundTask] = None) -> StreamingResponse:
+    size = len(content) if content is not None else os.path.getsize(path)
+    body = _iter_bytes(content) if content is not None else _iter_file(path)
+    response_headers = {"Content-Length": str(size), "Content-Disposition": content_disposition(filename), **(headers or {})}
+    return StreamingResponse(body, media_type=media_type, headers=response_headers, background=background)
@@ -0,0 +1,42 @@
+import asyncio
+import logging
+import aioboto3
+from typing import Any, Optional
+from aiobotocore.config import AioConfig
+from app.config import settings
+
+
+class S3ClientPool:
+    # One long-lived async S3 client per process, opened in the FastAPI lifespan, so requests
+    # share its connection pool and resolved credentials instead of building a session and
+    # client per call.
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, max_pool_connections: int, connect_timeout: float, read_timeout: float):
+        self.max_pool_connections = max_pool_connections
+        self.config = AioConfig(max_pool_connections=max_pool_connections, connect_timeout=connect_timeout, read_timeout=read_timeout, tcp_keepalive=True, retries={"max_attempts": 3, "mode": "adaptive"})
+        self._context: Optional[Any] = None
+        self._client: Optional[Any] = None
+        self._lock = asyncio.Lock()
+
+    def _credentials(self) -> dict:
+        return dict(aws_access_key_id=settings.aws_access_key_id, aws_secret_access_key=settings.aws_secret_access_key, region_name=settings.aws_region)
+
+    async def start(self) -> None:
+        async with self._lock:
+            if self._client is not None: return
+            self._context = aioboto3.Session(**self._credentials()).client("s3", config=self.config)
+            self._client = await self._context.__aenter__()
+            self.logger.info(f"S3 client started with a pool of {self.max_pool_connections} connection(s)")
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self._context is not None: await self._context.__aexit__(None, None, None)
+            self._context, self._client = None, None
+
+    async def client(self) -> Any:
+        if self._client is None: await self.start()
+        return self._client
+
+
+s3_pool = S3ClientPool(max_pool_connections=settings.s3_max_pool_connections, connect_timeout=settings.s3_connect_timeout, read_timeout=settings.s3_read_timeout)
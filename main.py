@@ -7,6 +7,14 @@ from app.lib.limitter import limiter
 from app.middleware.logging_middleware import LoggingMiddleware
 from contextlib import asynccontextmanager
 from app.database import Database
+from app.document.renderer import pdf_renderer
+from app.document.cache import download_handles
+from app.document.templates import template_registry
+from app.document.parsers import parser_engine
+from app.lib.http_client import HttpClient
+from app.lib.s3 import s3_pool
+from app.database.notify import notification_listener
+from app.gateway.worker import create_worker
 from app.error_handler import setup_error_handlers
 from app.auth.route import router as auth_router
 from app.user.route import router as user_router
@@ -19,7 +27,25 @@ from app.session_state.route import router as session_state_router
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await Database.init_db()
+    template_registry.load()
+    await pdf_renderer.start()
+    for client in HttpClient.instances: await client.start()
+    await s3_pool.start()
+    download_handles.start()
+    # Embedded workers run gateway pipelines inside the API process, so a single container needs
+    # nothing else. Set GATEWAY_EMBEDDED_WORKERS=0 when dedicated `python -m app.gateway.worker`
+    # processes run them instead; direct uploads are then stored in S3 before they are queued,
+    # rather than handed to workers on this host through the document cache.
+    worker = create_worker(settings.gateway_embedded_workers) if settings.gateway_embedded_workers else None
+    if worker: await worker.start()
     yield
+    if worker: await worker.stop()
+    await download_handles.stop()
+    await notification_listener.close()
+    await HttpClient.close_all()
+    await s3_pool.close()
+    pdf_renderer.shutdown()
+    parser_engine.shutdown()
 
 
 app = FastAPI(
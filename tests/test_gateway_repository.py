@@ -0,0 +1,135 @@
+import os
+from uuid import uuid4
+from datetime import timedelta
+import pytest
+from sqlmodel import SQLModel
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database.models import GatewayJob, GatewayJobStatus, Session, User, default_time
+from app.gateway.repository import GatewayJobRepository
+
+# claim_next and requeue rely on Postgres (SKIP LOCKED, interval arithmetic, JSONB), so these
+# run against the database in TEST_DATABASE_URL, inside a transaction that is rolled back.
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+pytestmark = [pytest.mark.anyio, pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")]
+
+LEASE_SECONDS = 60
+HANDOFF_SECONDS = 300
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine(TEST_DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"))
+    async with engine.connect() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+        await connection.commit()
+        transaction = await connection.begin()
+        async with AsyncSession(bind=connection, expire_on_commit=False) as session: yield session
+        await transaction.rollback()
+    await engine.dispose()
+
+
+@pytest.fixture
+async def owner(session):
+    user = User(name="Test", username=f"test-{uuid4()}", email=f"{uuid4()}@example.com")
+    user_session = Session(user_id=user.id, session_token=str(uuid4()))
+    session.add(user)
+    await session.flush()
+    session.add(user_session)
+    await session.flush()
+    return user_session
+
+
+@pytest.fixture
+def repository(session):
+    return GatewayJobRepository(session)
+
+
+async def add_job(session, owner, **values) -> GatewayJob:
+    values = {"file_key": f"documents/{owner.user_id}/resume.pdf", **values}
+    job = GatewayJob(user_id=owner.user_id, session_id=owner.id, submission_key=str(uuid4()), template_name="default", job_description="Engineer", **values)
+    session.add(job)
+    await session.flush()
+    session.expunge(job)
+    return job
+
+
+async def reload(session, job: GatewayJob) -> GatewayJob:
+    return await session.get(GatewayJob, job.id, populate_existing=True)
+
+
+def ago(seconds: int):
+    return default_time() - timedelta(seconds=seconds)
+
+
+async def test_claim_next_takes_the_oldest_stored_pending_job(session, owner, repository):
+    await add_job(session, owner, file_key=None)
+    first = await add_job(session, owner)
+    second = await add_job(session, owner)
+    claimed = await repository.claim_next("worker-1", "host-a", LEASE_SECONDS, 4)
+    assert claimed.id == first.id
+    assert (claimed.status, claimed.worker_id, claimed.attempts) == (GatewayJobStatus.RUNNING, "worker-1", 1)
+    assert claimed.lease_expires_at is not None
+    assert (await repository.claim_next("worker-2", "host-a", LEASE_SECONDS, 4)).id == second.id
+    assert await repository.claim_next("worker-3", "host-a", LEASE_SECONDS, 4) is None
+
+
+async def test_claim_next_leaves_handed_off_uploads_to_their_host(session, owner, repository):
+    job = await add_job(session, owner, upload_host="host-a", lease_expires_at=default_time() + timedelta(seconds=HANDOFF_SECONDS))
+    assert await repository.claim_next("worker-b", "host-b", LEASE_SECONDS, 4) is None
+    assert (await repository.claim_next("worker-a", "host-a", LEASE_SECONDS, 4)).id == job.id
+
+
+async def test_claim_next_reclaims_running_jobs_with_an_expired_lease(session, owner, repository):
+    live = await add_job(session, owner, status=GatewayJobStatus.RUNNING, worker_id="worker-1", attempts=1, lease_expires_at=default_time() + timedelta(seconds=LEASE_SECONDS))
+    expired = await add_job(session, owner, status=GatewayJobStatus.RUNNING, worker_id="worker-2", attempts=1, lease_expires_at=ago(1))
+    claimed = await repository.claim_next("worker-3", "host-a", LEASE_SECONDS, 4)
+    assert claimed.id == expired.id
+    assert (claimed.worker_id, claimed.attempts) == ("worker-3", 2)
+    assert await repository.claim_next("worker-4", "host-a", LEASE_SECONDS, 4) is None
+    assert (await reload(session, live)).worker_id == "worker-1"
+
+
+async def test_claim_next_caps_running_jobs_per_batch(session, owner, repository):
+    batch_id = uuid4()
+    first = await add_job(session, owner, batch_id=batch_id)
+    await add_job(session, owner, batch_id=batch_id)
+    single = await add_job(session, owner)
+    assert (await repository.claim_next("worker-1", "host-a", LEASE_SECONDS, 1)).id == first.id
+    assert (await repository.claim_next("worker-2", "host-a", LEASE_SECONDS, 1)).id == single.id
+    assert await repository.claim_next("worker-3", "host-a", LEASE_SECONDS, 1) is None
+
+
+async def test_requeue_moves_a_failed_job_back_to_the_queue_once(session, owner, repository):
+    job = await add_job(session, owner, status=GatewayJobStatus.FAILED, error="parse failed", attempts=3, last_sequence=7)
+    assert await repository.requeue(job.id)
+    job = await reload(session, job)
+    assert (job.status, job.error, job.attempts, job.attempt_sequence) == (GatewayJobStatus.PENDING, None, 0, 7)
+    assert not await repository.requeue(job.id)
+
+
+async def test_requeue_reclaims_pending_uploads_whose_hold_lapsed(session, owner, repository):
+    held = await add_job(session, owner, upload_host="host-a", lease_expires_at=default_time() + timedelta(seconds=HANDOFF_SECONDS))
+    lapsed = await add_job(session, owner, upload_host="host-a", lease_expires_at=ago(1))
+    assert not await repository.requeue(held.id)
+    assert await repository.requeue(lapsed.id)
+
+
+async def test_requeue_leaves_running_and_succeeded_jobs(session, owner, repository):
+    running = await add_job(session, owner, status=GatewayJobStatus.RUNNING, worker_id="worker-1", lease_expires_at=ago(1))
+    succeeded = await add_job(session, owner, status=GatewayJobStatus.SUCCESS)
+    assert not await repository.requeue(running.id)
+    assert not await repository.requeue(succeeded.id)
+
+
+async def test_release_returns_a_running_job_to_the_queue(session, owner, repository):
+    stored = await add_job(session, owner, status=GatewayJobStatus.RUNNING, worker_id="worker-1", lease_expires_at=default_time() + timedelta(seconds=LEASE_SECONDS))
+    handed_off = await add_job(session, owner, upload_host="host-a", status=GatewayJobStatus.RUNNING, worker_id="worker-1", lease_expires_at=default_time() + timedelta(seconds=LEASE_SECONDS))
+    await repository.release(stored.id, "worker-2", HANDOFF_SECONDS)
+    assert (await reload(session, stored)).status == GatewayJobStatus.RUNNING
+    await repository.release(stored.id, "worker-1", HANDOFF_SECONDS)
+    await repository.release(handed_off.id, "worker-1", HANDOFF_SECONDS)
+    stored, handed_off = await reload(session, stored), await reload(session, handed_off)
+    assert (stored.status, stored.worker_id, stored.lease_expires_at) == (GatewayJobStatus.PENDING, None, None)
+    assert (handed_off.status, handed_off.worker_id) == (GatewayJobStatus.PENDING, None)
+    assert handed_off.lease_expires_at > default_time()
@@ -0,0 +1,63 @@
+import asyncio
+import hashlib
+import tempfile
+import pytest
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+from app.document.ingest import UploadBuffer
+
+pytestmark = pytest.mark.anyio
+
+CONTENT = bytes(range(256)) * 64
+
+
+def make_upload(content: bytes = CONTENT) -> UploadFile:
+    file = tempfile.SpooledTemporaryFile()
+    file.write(content)
+    file.seek(0)
+    return UploadFile(file=file, filename="resume.pdf", size=len(content), headers=Headers({"content-type": "application/pdf"}))
+
+
+async def collect(upload: UploadBuffer, chunk_size: int) -> bytes:
+    return b"".join([bytes(chunk) async for chunk in upload.chunks(chunk_size)])
+
+
+async def test_small_upload_is_read_into_memory():
+    upload = await UploadBuffer.from_upload(make_upload(), spool_threshold=len(CONTENT))
+    assert upload.file is None
+    assert upload.content == CONTENT
+    assert (upload.filename, upload.content_type, upload.size) == ("resume.pdf", "application/pdf", len(CONTENT))
+    assert upload.sha256 == hashlib.sha256(CONTENT).hexdigest()
+    assert await upload.read() is upload.content
+
+
+async def test_small_upload_chunks_share_the_content():
+    upload = await UploadBuffer.from_upload(make_upload(), spool_threshold=len(CONTENT))
+    chunks = [chunk async for chunk in upload.chunks(1000)]
+    assert [len(chunk) for chunk in chunks] == [1000] * 16 + [len(CONTENT) - 16000]
+    assert all(isinstance(chunk, memoryview) and chunk.obj is upload.content for chunk in chunks)
+    assert b"".join(chunks) == CONTENT
+
+
+async def test_large_upload_stays_spooled():
+    upload = await UploadBuffer.from_upload(make_upload(), spool_threshold=len(CONTENT) - 1)
+    assert upload.content is None
+    assert upload.file is not None
+    assert upload.size == len(CONTENT)
+    assert upload.sha256 == hashlib.sha256(CONTENT).hexdigest()
+    assert await collect(upload, 1000) == CONTENT
+    assert upload.content is None
+
+
+async def test_large_upload_is_read_once_on_demand():
+    upload = await UploadBuffer.from_upload(make_upload(), spool_threshold=0)
+    content = await upload.read()
+    assert content == CONTENT
+    assert await upload.read() is content
+    assert await collect(upload, 1000) == CONTENT
+
+
+async def test_large_upload_serves_concurrent_consumers():
+    upload = await UploadBuffer.from_upload(make_upload(), spool_threshold=0)
+    results = await asyncio.gather(collect(upload, 1000), collect(upload, 4096), collect(upload, 333))
+    assert results == [CONTENT] * 3
@@ -0,0 +1,90 @@
+import asyncio
+import pytest
+from app.gateway.pipeline import Pipeline, PipelineError, Stage
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_stages_receive_dependency_results_in_order():
+    async def constant(value): return value
+    async def combine(*values): return list(values)
+    pipeline = Pipeline([
+        Stage("a", lambda: constant("a")),
+        Stage("b", lambda: constant("b")),
+        Stage("c", combine, depends_on=["b", "a"]),
+    ])
+    assert await pipeline.run() == {"a": "a", "b": "b", "c": ["b", "a"]}
+
+
+async def test_stage_starts_after_its_dependencies_finish():
+    order = []
+    async def record(name, delay=0.0):
+        await asyncio.sleep(delay)
+        order.append(name)
+    pipeline = Pipeline([
+        Stage("slow", lambda: record("slow", 0.02)),
+        Stage("fast", lambda: record("fast")),
+        Stage("last", lambda *_: record("last"), depends_on=["slow", "fast"]),
+    ])
+    await pipeline.run()
+    assert order == ["fast", "slow", "last"]
+
+
+async def test_independent_stages_overlap():
+    started = asyncio.Event()
+    async def waiter():
+        await asyncio.wait_for(started.wait(), timeout=1)
+        return "waited"
+    async def starter():
+        started.set()
+        return "started"
+    result = await Pipeline([Stage("waiter", waiter), Stage("starter", starter)]).run()
+    assert result == {"waiter": "waited", "starter": "started"}
+
+
+async def test_failure_is_raised_with_its_stage():
+    error = RuntimeError("parse failed")
+    async def fail(): raise error
+    with pytest.raises(PipelineError) as info: await Pipeline([Stage("parse", fail)]).run()
+    assert info.value.stage == "parse"
+    assert info.value.error is error
+    assert str(info.value) == "parse failed"
+
+
+async def test_failure_cancels_running_stages_and_skips_dependents():
+    cancelled, ran = asyncio.Event(), []
+    async def fail(): raise ValueError("store failed")
+    async def hang():
+        try: await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+    async def dependent(_): ran.append("save")
+    pipeline = Pipeline([
+        Stage("store", fail),
+        Stage("parse", hang),
+        Stage("save", dependent, depends_on=["store"]),
+    ])
+    with pytest.raises(PipelineError) as info: await pipeline.run()
+    assert info.value.stage == "store"
+    assert cancelled.is_set()
+    assert ran == []
+
+
+async def test_failure_propagates_through_dependents_unwrapped():
+    async def fail(): raise ValueError("extract failed")
+    async def dependent(_): return None
+    pipeline = Pipeline([Stage("extract", fail), Stage("save", dependent, depends_on=["extract"])])
+    with pytest.raises(PipelineError) as info: await pipeline.run()
+    assert info.value.stage == "extract"
+    assert isinstance(info.value.error, ValueError)
+
+
+def test_unknown_dependency_is_rejected():
+    async def run(): return None
+    with pytest.raises(ValueError, match="unknown stage"): Pipeline([Stage("save", run, depends_on=["parse"])])
+
+
+def test_cycle_is_rejected():
+    async def run(*_): return None
+    with pytest.raises(ValueError, match="cycle"): Pipeline([Stage("a", run, depends_on=["b"]), Stage("b", run, depends_on=["a"])])